@@ -1,12 +1,31 @@
+import collections
 import contextlib
+import cProfile
 import gzip
+import heapq
+import math
 import mmap
+import multiprocessing
 import os
+import pickle
+import pstats
 import re
+import sys
+import tempfile
+import time
 from itertools import product
 from typing import List, Iterable
+
+import numpy as np
 import tqdm
 
+try:
+    from util.clause_array import ClauseArray, take_clauses
+except ImportError:
+    # Run as a standalone script: `util` is in the repository root, next to `scripts`
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from util.clause_array import ClauseArray, take_clauses
+
 
 def bool2int(b):
     return 1 if b else 0
@@ -33,6 +52,104 @@ def sorted_clauses(clauses):
     return result
 
 
+def _clause_sort_key(clause):
+    return (len(clause), tuple(map(abs, clause)))
+
+
+class ExternalClauseSorter:
+    """
+    Sorts clauses in the same order as `sorted_clauses` with bounded memory:
+    clauses are collected into runs of `run_size`, each run is sorted and spilled
+    to a temporary file, and the runs are merged with a k-way merge.
+    With `is_unique`, repeated clauses (equal after sorting literals by variable) are removed.
+
+    ### Usage:
+    ```
+    with ExternalClauseSorter(run_size=10**6) as sorter:
+        sorter.add(clauses)
+        for clause in sorter.sorted():
+            ...
+    ```
+    """
+
+    def __init__(self, run_size=1000000, tmp_dir=None, is_unique=False):
+        self.run_size = run_size
+        self.tmp_dir = tmp_dir
+        self.is_unique = is_unique
+        self.run = []
+        self.run_paths = []
+        self._tmp = None
+
+    def add(self, clauses):
+        for clause in clauses:
+            self.run.append(sorted(clause, key=abs))
+            if len(self.run) >= self.run_size:
+                self._spill()
+
+    def _spill(self):
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(dir=self.tmp_dir, prefix="clause-sort-")
+        self.run.sort(key=_clause_sort_key)
+        path = os.path.join(self._tmp.name, f"run-{len(self.run_paths)}.pkl")
+        with open(path, "wb") as f:
+            for i in range(0, len(self.run), 10000):
+                pickle.dump(self.run[i : i + 10000], f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.run_paths.append(path)
+        self.run = []
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    return
+
+    def sorted(self):
+        """
+        Yields the clauses (with literals sorted by variable) in sorted order.
+        Runs are merged in the order they were added, so ties keep the input order, as in `sorted_clauses`.
+        """
+
+        self.run.sort(key=_clause_sort_key)
+        if not self.run_paths:
+            merged = iter(self.run)
+        else:
+            merged = heapq.merge(*map(self._read_run, self.run_paths), self.run, key=_clause_sort_key)
+        if not self.is_unique:
+            yield from merged
+            return
+        # Equal clauses have equal keys, so it is enough to remember the clauses of the current key
+        key = None
+        seen = set()
+        for clause in merged:
+            clause_key = _clause_sort_key(clause)
+            if clause_key != key:
+                key = clause_key
+                seen.clear()
+            literals = tuple(clause)
+            if literals not in seen:
+                seen.add(literals)
+                yield clause
+
+    @property
+    def num_runs(self):
+        return len(self.run_paths) + 1
+
+    def close(self):
+        self.run = []
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 def parse_backdoors(path) -> List[List[int]]:
     backdoors = []
     with open(path, "r") as f:
@@ -45,10 +162,18 @@ def parse_backdoors(path) -> List[List[int]]:
     return backdoors
 
 
-def partition_tasks(solver, variables):
+def partition_tasks(solver, variables, prefix=(), harvester=None):
     """
     Partition tasks into "hard" and "easy" categories based
     on their solvability using only Unit Propagation.
+    If `prefix` (literals of the first backdoor variables) is given,
+    only the tasks extending it are partitioned. If `harvester` is given,
+    the implications seen during propagation are collected into it.
+
+    Assignments are enumerated via depth-first search over prefixes:
+    a prefix leading to a conflict makes its whole subtree easy, and a variable
+    already fixed by propagating the prefix does not need another propagation.
+    Cubes are listed in the same order as `itertools.product` would produce them.
 
     ### Returns:
         `Tuple[List[List[Literal]], List[List[Literal]]]`: A tuple containing two lists.
@@ -61,22 +186,102 @@ def partition_tasks(solver, variables):
     hard = []
     easy = []
 
-    for assignment in product([False, True], repeat=len(variables)):
-        assumptions = [signed(variables[i], s) for i, s in enumerate(assignment)]
-        (result, _) = solver.propagate(assumptions)
-        # 'result' is True if there is NO conflict, which corresponds to a "hard" task
-        # 'result' is False when there IS a conflict, which corresponds to an "easy" task
+    def add_easy_subtree(assumptions):
+        depth = len(assumptions)
+        for assignment in product([False, True], repeat=len(variables) - depth):
+            easy.append(assumptions + [signed(variables[depth + i], s) for i, s in enumerate(assignment)])
 
-        if result == True:
-            # print(f"Found hard task: {assumptions}")
+    def search(assumptions, implied):
+        depth = len(assumptions)
+        if depth == len(variables):
             hard.append(assumptions)
-        elif result == False:
-            # print(f"Found easy task: {assumptions}")
-            easy.append(assumptions)
+            return
+
+        x = variables[depth]
+        branches_implied = []
+        for s in [False, True]:
+            lit = signed(x, s)
+            cube = assumptions + [lit]
+            if -lit in implied:
+                # the opposite literal is implied by the prefix, so this branch conflicts
+                add_easy_subtree(cube)
+            elif lit in implied:
+                # the literal is implied by the prefix, so propagation gives nothing new
+                search(cube, implied)
+                branches_implied.append(implied)
+            else:
+                (result, propagated) = solver.propagate(cube)
+                # 'result' is True if there is NO conflict
+                # 'result' is False when there IS a conflict, so every extension is an "easy" task
+                if result == True:
+                    cube_implied = set(propagated)
+                    if harvester is not None:
+                        harvester.add_implications(cube, cube_implied)
+                    search(cube, cube_implied)
+                    branches_implied.append(cube_implied)
+                else:
+                    if harvester is not None:
+                        harvester.add_conflict(cube)
+                    add_easy_subtree(cube)
+
+        if harvester is not None and len(branches_implied) == 2 and depth < harvester.max_size:
+            # literals implied by both branches are implied by the prefix itself
+            harvester.add_implications(assumptions, branches_implied[0] & branches_implied[1])
+
+    prefix = list(prefix)
+    (result, propagated) = solver.propagate(prefix)
+    if result == True:
+        prefix_implied = set(propagated)
+        if harvester is not None:
+            harvester.add_implications(prefix, prefix_implied)
+        search(prefix, prefix_implied)
+    else:
+        if harvester is not None:
+            harvester.add_conflict(prefix)
+        add_easy_subtree(prefix)
 
     return hard, easy
 
 
+class ImplicationHarvester:
+    """
+    Collects short clauses implied by the results of Unit Propagation, at no extra solver calls.
+    If propagating a cube implies a literal `x`, then `(~cube | x)` holds;
+    if it leads to a conflict, then `~cube` holds. Only clauses with at most
+    `max_size` literals are kept, i.e. units and binary clauses by default.
+    """
+
+    def __init__(self, max_size=2):
+        self.max_size = max_size
+        self.clauses_set = set()
+
+    def add_implications(self, cube, implied):
+        if len(cube) >= self.max_size:
+            return
+        negated = [-lit for lit in cube]
+        for x in implied:
+            if x not in cube:
+                self.clauses_set.add(tuple(sorted(negated + [x], key=abs)))
+
+    def add_conflict(self, cube):
+        if len(cube) <= self.max_size:
+            self.clauses_set.add(tuple(sorted((-lit for lit in cube), key=abs)))
+
+    def update(self, other):
+        self.clauses_set.update(other.clauses_set)
+
+    def clauses(self):
+        """
+        ### Returns:
+            `List[List[int]]`: harvested clauses, without those subsumed by harvested units.
+        """
+
+        units = set(c[0] for c in self.clauses_set if len(c) == 1)
+        result = [list(c) for c in self.clauses_set if len(c) == 1 or not any(lit in units for lit in c)]
+        result.sort(key=lambda c: (len(c), tuple(map(abs, c)), c))
+        return result
+
+
 def determine_semieasy_tasks(solver, hard_tasks, num_confl=1000):
     semieasy = []
 
@@ -94,9 +299,131 @@ def determine_semieasy_tasks(solver, hard_tasks, num_confl=1000):
     return semieasy
 
 
-def perform_probing(solver, variables, is_add_units=False) -> List[int]:
+_worker_solver = None
+_worker_solver_limited = None
+_worker_num_added = 0
+
+
+def _init_partition_worker(clauses, solver_name, limited_solver_name):
+    from pysat.solvers import Solver
+
+    global _worker_solver, _worker_solver_limited
+    _worker_solver = Solver(solver_name, bootstrap_with=clauses)
+    if limited_solver_name:
+        _worker_solver_limited = Solver(limited_solver_name, bootstrap_with=clauses)
+
+
+def _sync_partition_worker(added):
+    global _worker_num_added
+    for clause in added[_worker_num_added:]:
+        _worker_solver.add_clause(clause)
+        if _worker_solver_limited is not None:
+            _worker_solver_limited.add_clause(clause)
+    _worker_num_added = len(added)
+
+
+def _partition_worker(args):
+    variables, prefix, added, is_harvest = args
+    _sync_partition_worker(added)
+    harvester = ImplicationHarvester() if is_harvest else None
+    hard, easy = partition_tasks(_worker_solver, variables, prefix, harvester)
+    return hard, easy, harvester
+
+
+def _call_in_worker(args):
+    func, task, added = args
+    _sync_partition_worker(added)
+    return func(_worker_solver, _worker_solver_limited, *task)
+
+
+def _semieasy_worker(args):
+    cubes, num_confl, added = args
+    _sync_partition_worker(added)
+    return determine_semieasy_tasks(_worker_solver_limited, cubes, num_confl)
+
+
+class ParallelPartitioner:
+    """
+    Process pool for `partition_tasks` and `determine_semieasy_tasks`.
+    Each worker bootstraps its own solvers once, the cube space of a backdoor
+    is split by a fixed prefix of its variables, and the results are merged
+    in the same order as the sequential functions produce them.
+
+    ### Usage:
+    ```
+    with ParallelPartitioner(cnf.clauses, jobs=8) as partitioner:
+        hard, easy = partitioner.partition_tasks(variables)
+    ```
+    """
+
+    def __init__(self, clauses, jobs, solver_name="glucose42", limited_solver_name=None):
+        self.jobs = jobs
+        self.added = []
+        self.pool = multiprocessing.Pool(
+            jobs,
+            initializer=_init_partition_worker,
+            initargs=(clauses, solver_name, limited_solver_name),
+        )
+
+    def add_clause(self, clause):
+        # Clauses are delivered to the workers lazily, together with their next task
+        self.added.append(list(clause))
+
+    def partition_tasks(self, variables, harvester=None):
+        # Roughly 4 tasks per worker to balance uneven subtrees
+        num_fixed = min(len(variables), (4 * self.jobs - 1).bit_length())
+        tasks = []
+        for assignment in product([False, True], repeat=num_fixed):
+            prefix = [signed(variables[i], s) for i, s in enumerate(assignment)]
+            tasks.append((variables, prefix, self.added, False))
+        if harvester is not None:
+            # Harvested clauses have at most 2 literals, so they only depend on the first
+            # two levels of the search, which the prefixed tasks do not visit on their own
+            tasks.append((variables[: harvester.max_size], [], self.added, True))
+
+        hard = []
+        easy = []
+        for sub_hard, sub_easy, sub_harvester in self.pool.imap(_partition_worker, tasks):
+            if sub_harvester is not None:
+                harvester.update(sub_harvester)
+                continue
+            hard += sub_hard
+            easy += sub_easy
+        return hard, easy
+
+    def determine_semieasy_tasks(self, hard_tasks, num_confl=1000):
+        chunk_size = max(1, math.ceil(len(hard_tasks) / (4 * self.jobs)))
+        tasks = [(hard_tasks[i : i + chunk_size], num_confl, self.added) for i in range(0, len(hard_tasks), chunk_size)]
+
+        semieasy = []
+        for sub_semieasy in self.pool.imap(_semieasy_worker, tasks):
+            semieasy += sub_semieasy
+        return semieasy
+
+    def imap(self, func, tasks):
+        """
+        Lazily applies `func(solver, solver_limited, *task)` to each task
+        in the workers, yielding the results in the order of `tasks`.
+        """
+
+        added = list(self.added)
+        return self.pool.imap(_call_in_worker, [(func, task, added) for task in tasks])
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def perform_probing(solver, variables, is_add_units=False, harvester=None) -> List[int]:
     """
     Performs failed literal probing.
+    If `harvester` is given, the implications of each probed literal are collected into it.
 
     ### Usage:
     ```
@@ -112,6 +439,7 @@ def perform_probing(solver, variables, is_add_units=False) -> List[int]:
     units = set()
 
     for x in variables:
+        branches_implied = []
         for s in [False, True]:
             lit = signed(x, s)
             # if -lit in units:
@@ -120,16 +448,26 @@ def perform_probing(solver, variables, is_add_units=False) -> List[int]:
             #     raise ValueError("!")
             #     continue
 
-            (result, _) = solver.propagate(assumptions=[lit])
+            (result, propagated) = solver.propagate(assumptions=[lit])
             # 'result' is True if there is NO conflict
             # 'result' is False when there IS a conflict
 
             if result == False:
                 units.add(-lit)
+                if harvester is not None:
+                    harvester.add_conflict([lit])
+            elif harvester is not None:
+                implied = set(propagated)
+                harvester.add_implications([lit], implied)
+                branches_implied.append(implied)
 
             if is_add_units:
                 solver.add_clause([-lit])
 
+        if harvester is not None and len(branches_implied) == 2:
+            # literals implied by both polarities of `x` are units
+            harvester.add_implications([], branches_implied[0] & branches_implied[1])
+
     return sorted(units, key=abs)
 
 
@@ -223,6 +561,256 @@ def backdoor_to_clauses_via_easy(variables, easy):
     return clauses
 
 
+def cubes_to_truth_table(variables, cubes):
+    """
+    Packs cubes over `variables` into a boolean truth table with one axis per variable,
+    where index 0 on an axis means the positive literal and index 1 means the negative one.
+    """
+
+    k = len(variables)
+    signs = np.array([[lit < 0 for lit in cube] for cube in cubes], dtype=np.int64).reshape(len(cubes), k)
+    indices = signs @ (1 << np.arange(k - 1, -1, -1, dtype=np.int64))
+    table = np.zeros(2**k, dtype=bool)
+    table[indices] = True
+    return table.reshape((2,) * k)
+
+
+def minimize_truth_table(table):
+    """
+    Computes a prime and irredundant cover of the ones of the truth table.
+
+    ### Returns:
+        `List[List[Optional[int]]]`: cubes, where each position is the index
+        on the variable axis (0 or 1), or `None` if the variable is free.
+    """
+
+    k = table.ndim
+
+    def region(cube):
+        return tuple(slice(None) if b is None else b for b in cube)
+
+    covered = np.zeros_like(table)
+    cubes = []
+    for index in np.flatnonzero(table):
+        if covered.flat[index]:
+            continue
+        minterm = [(int(index) >> (k - 1 - j)) & 1 for j in range(k)]
+        # Expand the minterm into prime implicants by freeing variables one by one,
+        # starting from each variable in turn, and keep the one covering most new ones
+        best_cube = None
+        best_gain = -1
+        for start in range(max(k, 1)):
+            cube = list(minterm)
+            for j in [*range(start, k), *range(start)]:
+                value = cube[j]
+                cube[j] = None
+                if not table[region(cube)].all():
+                    cube[j] = value
+            gain = np.count_nonzero(~covered[region(cube)])
+            if gain > best_gain:
+                best_cube = cube
+                best_gain = gain
+        covered[region(best_cube)] = True
+        cubes.append(best_cube)
+
+    # Remove redundant cubes, trying the smallest ones first
+    count = np.zeros(table.shape, dtype=np.int32)
+    for cube in cubes:
+        count[region(cube)] += 1
+    result = []
+    for cube in sorted(cubes, key=lambda c: sum(b is None for b in c)):
+        if count[region(cube)].min() > 1:
+            count[region(cube)] -= 1
+        else:
+            result.append(cube)
+    return result
+
+
+def backdoor_to_clauses_via_easy_bitset(variables, easy):
+    print(f"Minimizing {len(easy)} cubes over {len(variables)} variables via bitset truth table...")
+
+    # Note: here, the table represents the negation of characteristic function,
+    #       because we use "easy" tasks here, so every implicant gives a clause.
+    table = cubes_to_truth_table(variables, easy)
+    clauses = []
+    for cube in minimize_truth_table(table):
+        clause = [signed(variables[j], b == 0) for j, b in enumerate(cube) if b is not None]
+        clause.sort(key=lambda x: abs(x))
+        clauses.append(clause)
+
+    clauses.sort(key=lambda x: (len(x), tuple(map(abs, x))))
+    print(
+        f"Total {len(clauses)} clauses: {sum(1 for clause in clauses if len(clause) == 1)} units, {sum(1 for clause in clauses if len(clause) == 2)} binary, {sum(1 for clause in clauses if len(clause) == 3)} ternary, {sum(1 for clause in clauses if len(clause) > 3)} larger"
+    )
+    return clauses
+
+
+EASY_MINIMIZERS = {
+    "espresso": backdoor_to_clauses_via_easy,
+    "bitset": backdoor_to_clauses_via_easy_bitset,
+}
+
+
+class MinimizationCache:
+    """
+    LRU cache of characteristic function minimization results.
+    The key is the minimizer name, the sorted backdoor variables and the packed
+    bitmap of easy tasks over them, so the same function is recognized regardless
+    of the order of variables in the backdoor. If `path` is given, the cache
+    is loaded from it (if the file exists) and `save` writes it back.
+    """
+
+    def __init__(self, max_size=1024, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.entries.update(pickle.load(f))
+            print(f"Loaded {len(self.entries)} minimization results from '{path}'")
+
+    @staticmethod
+    def make_key(minimizer, variables, easy):
+        order = sorted(range(len(variables)), key=lambda j: variables[j])
+        table = cubes_to_truth_table(variables, easy).transpose(order)
+        return (minimizer, tuple(variables[j] for j in order), np.packbits(table).tobytes())
+
+    def lookup(self, key):
+        clauses = self.entries.get(key)
+        if clauses is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return clauses
+
+    def store(self, key, clauses):
+        self.entries[key] = clauses
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(list(self.entries.items()), f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses, {len(self.entries)} entries"
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time spent in named stages.
+
+    ### Usage:
+    ```
+    timer = StageTimer()
+    with timer.measure("partition"):
+        hard, easy = partition_tasks(solver, variables)
+    timer.seconds["partition"]
+    ```
+    """
+
+    def __init__(self):
+        self.seconds = collections.defaultdict(float)
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        time_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - time_start
+
+    def update(self, other):
+        for stage, seconds in other.seconds.items():
+            self.seconds[stage] += seconds
+
+    def summary(self):
+        return ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in self.seconds.items())
+
+
+class Profiler:
+    """
+    Opt-in cProfile capture of named sections (an iteration, a backdoor).
+    Each section is dumped to `<profile_dir>/<name>.prof`, which `pstats` or
+    snakeviz can open, with the top functions by cumulative time in `<name>.txt`.
+    Without `profile_dir`, sections are not profiled. Sections must not be
+    nested, and only the thread entering a section is profiled: work done in
+    other processes is only seen as waiting, unless those processes profile it
+    themselves and their sections are registered with `add`.
+
+    ### Usage:
+    ```
+    profiler = Profiler("log/profile")
+    with profiler.profile("backdoor_1"):
+        evaluate_backdoor(solver, variables)
+    print(profiler.summary())
+    ```
+    """
+
+    def __init__(self, profile_dir=None, top=40):
+        self.profile_dir = profile_dir
+        self.top = top
+        self.names = []  # sections dumped by this run
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def profile(self, name):
+        if not self.profile_dir:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.add(name)
+            path = os.path.join(self.profile_dir, name)
+            profile.dump_stats(path + ".prof")
+            with open(path + ".txt", "w") as f:
+                pstats.Stats(profile, stream=f).strip_dirs().sort_stats("cumulative").print_stats(self.top)
+
+    def add(self, name):
+        """
+        Registers a section dumped into `profile_dir` by another process.
+        """
+
+        self.names.append(name)
+
+    def summary(self, names=None, top=10):
+        """
+        Lists the hottest functions by cumulative time over the given sections
+        (all sections of this run by default), so stale dumps left in `profile_dir`
+        by earlier runs are ignored.
+
+        ### Returns:
+            `str`: one line per function.
+        """
+
+        if not self.profile_dir:
+            return ""
+        names = self.names if names is None else names
+        paths = [os.path.join(self.profile_dir, f"{name}.prof") for name in names]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return ""
+        stats = pstats.Stats(*paths).strip_dirs()
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        return "\n".join(
+            f"{ct:10.3f} s cumulative {tt:10.3f} s own {nc:>10} calls  {pstats.func_std_string(func)}"
+            for func, (cc, nc, tt, ct, callers) in rows
+        )
+
+
 def backdoor_to_clauses_via_hard(variables, hard):
     dnf = cubes_to_dnf(variables, hard)
     (min_dnf,) = minimize_dnf(dnf)
@@ -330,7 +918,142 @@ def _parse_binary_drat_mmap(bs: Iterable[bytes]):
             raise ValueError(f"Bad state: {state}")
 
 
-# @contextlib.contextmanager
+def decode_binary_drat(data):
+    """
+    Vectorized decoder of a block of binary DRAT consisting of whole clauses.
+    Relies on the canonical varint encoding of literals, where a zero byte
+    only occurs as a clause terminator, so clause boundaries are found directly.
+
+    ### Returns:
+        `Tuple[np.ndarray, np.ndarray, np.ndarray]`: boolean array telling whether
+        each clause is added (`a`) rather than deleted (`d`), flat `int32` array
+        of literals, and `int64` array of `num_clauses + 1` clause offsets.
+    """
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buf == 0)
+    if len(ends) == 0 or ends[-1] != len(buf) - 1:
+        raise ValueError("Binary DRAT block does not end with a clause terminator")
+    headers = np.concatenate([np.zeros(1, dtype=np.int64), ends[:-1] + 1])
+    modes = buf[headers]
+    is_bad = (modes != ord("a")) & (modes != ord("d"))
+    if is_bad.any():
+        raise ValueError(f"Bad clause header: {bytes([modes[np.argmax(is_bad)]])}")
+    if (buf[ends[ends > 0] - 1] > 127).any():
+        raise ValueError("Non-canonical literal encoding in binary DRAT")
+
+    # Each literal is a little-endian base-128 varint, whose last byte is below 128
+    # and is preceded by its continuation bytes (128 and above), while the header
+    # and the terminator bytes are below 128, so varints are decoded backwards
+    is_last = buf < 128
+    is_last[headers] = False
+    is_last[ends] = False
+    last_positions = np.flatnonzero(is_last)
+    values = buf[last_positions].astype(np.int64)
+    is_running = np.ones(len(values), dtype=bool)
+    for k in range(1, 10):
+        previous = buf[last_positions - k]
+        is_running &= previous > 127
+        if not is_running.any():
+            break
+        values = np.where(is_running, (values << 7) | (previous & 127), values)
+    literals = ((values >> 1) * (1 - 2 * (values & 1))).astype(np.int32)
+
+    # Number of literals preceding each terminator
+    offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.searchsorted(last_positions, ends)])
+    return modes == ord("a"), literals, offsets
+
+
+def iter_binary_drat_blocks(path, chunk_size=1 << 26, start=0, end=None):
+    """
+    Yields `(position, data)` blocks of whole clauses of the binary DRAT file (optionally gzipped),
+    each ending with a clause terminator, read via `mmap` for plain files.
+    An incomplete clause at the end of the file is not yielded.
+    The byte range `[start, end)` is only supported for plain files, since
+    the positions in a gzipped file are offsets in its decompressed stream.
+    """
+
+    if path.endswith(".gz"):
+        if start != 0 or end is not None:
+            raise ValueError(f"Byte range is not supported for gzipped DRAT file '{path}'")
+        with open_maybe_gzipped(path, "rb") as f:
+            position = 0
+            tail = b""
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    return
+                data = tail + data
+                cut = data.rfind(b"\x00") + 1
+                tail = data[cut:]
+                if cut:
+                    yield position, data[:cut]
+                    position += cut
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if end is None:
+            end = size
+        if start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = start
+            while position < end:
+                cut = mm.rfind(b"\x00", position, min(position + chunk_size, end)) + 1
+                if cut == 0:
+                    # No terminator in the window: extend it up to the next one
+                    cut = mm.find(b"\x00", position, end) + 1
+                    if cut == 0:
+                        return
+                yield position, mm[position:cut]
+                position = cut
+
+
+def split_binary_drat(path, num_parts):
+    """
+    Splits the (plain) binary DRAT file into at most `num_parts` byte ranges
+    of roughly equal size, each starting right after a clause terminator.
+
+    ### Returns:
+        `List[Tuple[int, int]]`: `(start, end)` byte ranges covering the file.
+    """
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bounds = [0]
+            for i in range(1, num_parts):
+                bound = mm.find(b"\x00", max(i * size // num_parts, bounds[-1])) + 1
+                if bound == 0 or bound >= size:
+                    break
+                if bound > bounds[-1]:
+                    bounds.append(bound)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_binary_drat_batches(path, chunk_size=1 << 26, progress=None):
+    """
+    Decodes the binary DRAT file in blocks of about `chunk_size` bytes using `decode_binary_drat`.
+
+    ### Usage:
+    ```
+    for is_added, literals, offsets in parse_binary_drat_batches("proof.drat"):
+        ...
+    ```
+
+    ### Args:
+        - `progress`: `tqdm` progress bar (in bytes) updated after each block.
+    """
+
+    for _, data in iter_binary_drat_blocks(path, chunk_size):
+        yield decode_binary_drat(data)
+        if progress is not None:
+            progress.update(len(data))
+
+
 # def parse_binary_drat_mmap(path):
 #     with open(path, "rb") as f:
 #         with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
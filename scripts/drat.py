@@ -1,6 +1,12 @@
+import collections
+import contextlib
+import math
+import multiprocessing
+import os
 import time
 
 import click
+import numpy as np
 import tqdm
 
 from common import *
@@ -10,6 +16,71 @@ print = click.echo
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=999, show_default=True)
 
 
+def select_added_clauses(is_added, literals, offsets, max_size=None):
+    """
+    Selects the added clauses (of at most `max_size` literals) of a decoded DRAT block.
+
+    ### Returns:
+        `Tuple[np.ndarray, np.ndarray, Optional[List[int]]]`: literals and offsets
+        of the selected clauses, and the last clause of the block (added or deleted).
+    """
+
+    # ignore 'deleted' clauses
+    is_selected = is_added
+    if max_size:
+        # skip large clauses
+        is_selected = is_selected & (np.diff(offsets) <= max_size)
+    last = literals[offsets[-2] : offsets[-1]].tolist() if len(offsets) > 1 else None
+    return *take_clauses(literals, offsets, np.flatnonzero(is_selected)), last
+
+
+def _extract_range(args):
+    path, start, end, max_size, chunk_size = args
+    selected = [select_added_clauses(*decode_binary_drat(data), max_size) for _, data in iter_binary_drat_blocks(path, chunk_size, start, end)]
+    if not selected:
+        return np.zeros(0, dtype=np.int32), np.zeros(1, dtype=np.int64), None, end - start
+    literals = np.concatenate([b[0] for b in selected])
+    sizes = np.concatenate([np.diff(b[1]) for b in selected])
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return literals, offsets, selected[-1][2], end - start
+
+
+def extract_added_clauses(path_drat, max_size=None, chunk_size=1 << 26, jobs=1, progress=None):
+    """
+    Yields `(literals, offsets, last_clause)` batches of the added clauses of the binary DRAT proof,
+    in proof order. With `jobs > 1`, the proof is split into ranges at clause boundaries,
+    which are decoded by a pool of worker processes and yielded in order as they finish.
+    """
+
+    if jobs > 1 and not path_drat.endswith(".gz"):
+        # Ranges of about `chunk_size` (and at least 4 per worker) balance the load and let
+        # the output be written early; at most 2 ranges per worker are in flight, which
+        # bounds the memory held by decoded but not yet consumed ranges
+        num_ranges = max(4 * jobs, math.ceil(os.path.getsize(path_drat) / chunk_size))
+        tasks = [(path_drat, start, end, max_size, chunk_size) for start, end in split_binary_drat(path_drat, num_ranges)]
+        pool = multiprocessing.Pool(jobs)
+        pending = collections.deque()
+        try:
+            for task in tasks:
+                pending.append(pool.apply_async(_extract_range, (task,)))
+                while len(pending) >= 2 * jobs or (pending and task is tasks[-1]):
+                    literals, offsets, last, num_bytes = pending.popleft().get()
+                    yield literals, offsets, last
+                    if progress is not None:
+                        progress.update(num_bytes)
+        finally:
+            # Let the ranges in flight finish instead of terminating the pool,
+            # which may deadlock while workers are sending their results
+            for result in pending:
+                result.wait()
+            pool.close()
+            pool.join()
+    else:
+        for block in parse_binary_drat_batches(path_drat, chunk_size, progress):
+            yield select_added_clauses(*block, max_size)
+
+
 @click.command(context_settings=CONTEXT_SETTINGS)
 # @click.option("--cnf", "path_cnf", required=True, type=click.Path(exists=True), help="File with CNF")
 @click.option("--drat", "path_drat", required=True, type=click.Path(exists=True), help="File with DRAT proof")
@@ -17,6 +88,11 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=99
 @click.option("--limit", type=int, help="Maximum number of extracted clauses")
 @click.option("--max-size", type=int, help="Maximum size of learnt clauses")
 @click.option("--sort", "is_sort", is_flag=True, help="Sort the extracted clauses")
+@click.option("--chunk-size", default=1 << 26, show_default=True, type=int, help="Size of proof blocks decoded at once, bytes")
+@click.option("--jobs", type=int, default=1, show_default=True, help="Number of worker processes decoding the proof (not for gzipped proofs)")
+@click.option("--sort-run-size", default=1000000, show_default=True, type=int, help="Number of clauses sorted in memory before spilling to disk")
+@click.option("--unique", "is_unique", is_flag=True, help="Remove duplicate clauses when sorting")
+@click.option("--tmp-dir", "path_tmp_dir", type=click.Path(), help="Directory for sorted runs (system temporary directory by default)")
 def cli(
     # path_cnf,
     path_drat,
@@ -24,6 +100,11 @@ def cli(
     limit,
     max_size,
     is_sort,
+    chunk_size,
+    jobs,
+    sort_run_size,
+    is_unique,
+    path_tmp_dir,
 ):
     time_start = time.time()
 
@@ -34,46 +115,68 @@ def cli(
 
     print()
     print(f"Extracting clauses{f' (max-size = {max_size})' if max_size else ''} from '{path_drat}'...")
-    clauses = []
-
-    with parse_binary_drat_mmap_tqdm(path_drat) as parser:
-        for mode, clause in parser:
-            if mode == "a":
-                # 'added' clause
-                if max_size and len(clause) > max_size:
-                    # skip large clauses
-                    pass
-                else:
-                    clauses.append(clause)
-            elif mode == "d":
-                # ignore 'deleted' clauses
-                pass
-            else:
-                raise ValueError(f"Bad clause mode: '{mode}'")
-
-            if limit and len(clauses) >= limit:
-                parser.t.write(f"Reached limit {limit} of extracted clauses")
-                break
+    sorter = ExternalClauseSorter(sort_run_size, path_tmp_dir, is_unique) if is_sort else None
+    num_clauses = 0
+    first_clause = None
+    last_added_clause = None
+    clause = None
+
+    total = None if path_drat.endswith(".gz") else os.path.getsize(path_drat)
+    with contextlib.ExitStack() as stack:
+        # Without sorting, clauses are written as soon as they are extracted
+        output = stack.enter_context(open(path_output, "w")) if path_output and not is_sort else None
+        with tqdm.tqdm(total=total, unit="B", unit_scale=True) as t:
+            for literals, offsets, last in extract_added_clauses(path_drat, max_size, chunk_size, jobs, progress=t):
+                num_batch = len(offsets) - 1
+                is_limit_reached = limit and num_clauses + num_batch >= limit
+                if is_limit_reached:
+                    num_batch = limit - num_clauses
+                literals = literals.tolist()
+                offsets = offsets.tolist()
+                batch = [literals[offsets[i] : offsets[i + 1]] for i in range(num_batch)]
+
+                if batch:
+                    if first_clause is None:
+                        first_clause = batch[0]
+                    last_added_clause = batch[-1]
+                num_clauses += len(batch)
+                clause = batch[-1] if is_limit_reached else last if last is not None else clause
+
+                if output is not None:
+                    for c in batch:
+                        output.write(" ".join(map(str, c)) + " 0\n")
+                elif sorter is not None:
+                    sorter.add(batch)
+
+                if is_limit_reached:
+                    t.write(f"Reached limit {limit} of extracted clauses")
+                    break
 
     print(f"# last clause = {clause}")
 
     # Report extracted clauses
-    print(f"Exracted {len(clauses)} clauses")
-    if clauses:
-        print(f"First added clause: {clauses[0]}")
-        print(f"Last added clause: {clauses[-1]}")
+    print(f"Exracted {num_clauses} clauses")
+    if num_clauses:
+        print(f"First added clause: {first_clause}")
+        print(f"Last added clause: {last_added_clause}")
+    if output is not None:
+        print(f"Written {num_clauses} extracted clauses to '{path_output}'")
 
     # Sort extracted clauses
-    if is_sort:
-        print(f"Sorting {len(clauses)} clauses...")
-        clauses = sorted_clauses(clauses)
-
-    # Dump extracted clauses
-    if path_output:
-        print(f"Writing {len(clauses)} extracted clauses to '{path_output}'...")
-        with open(path_output, "w") as f:
-            for clause in tqdm.tqdm(clauses):
-                f.write(" ".join(map(str, clause)) + " 0\n")
+    if sorter is not None:
+        with sorter:
+            print(f"Sorting {num_clauses} clauses in {sorter.num_runs} run(s){' and removing duplicates' if is_unique else ''}...")
+            num_sorted = 0
+            with contextlib.ExitStack() as stack:
+                f = stack.enter_context(open(path_output, "w")) if path_output else None
+                for clause in tqdm.tqdm(sorter.sorted(), total=num_clauses):
+                    num_sorted += 1
+                    if f is not None:
+                        f.write(" ".join(map(str, clause)) + " 0\n")
+            if f is not None:
+                print(f"Written {num_sorted} sorted clauses to '{path_output}'")
+            elif is_unique:
+                print(f"Unique clauses: {num_sorted}")
 
     print()
     print(f"All done in {time.time() - time_start:.1f} s")
@@ -1,78 +1,206 @@
+import contextlib
+import io
 import time
 
 import click
+import numpy as np
 from pysat.formula import CNF
 from pysat.solvers import Solver
 
-from common import *
+if __package__:
+    from .common import *
+else:
+    from common import *
 
 print = click.echo
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=999, show_default=True)
 
 
-@click.command(context_settings=CONTEXT_SETTINGS)
-@click.option("--cnf", "path_cnf", required=True, type=click.Path(exists=True), help="File with CNF")
-@click.option("--backdoors", "path_backdoors", required=True, type=click.Path(exists=True), help="File with backdoors")
-@click.option("-o", "--output", "path_output", type=click.Path(), help="Output file")
-@click.option("--limit", "limit_backdoors", type=int, help="Number of backdoors to use (prefix size)")
-@click.option("--add-units", "is_add_derived_units", is_flag=True, help="Add derived units to the solver")
-@click.option(
-    "--num-confl",
-    type=int,
-    default=0,
-    show_default=True,
-    help="Number of conflicts in 'solve_limited' (0 for using 'propagate')",
-)
-@click.option(
-    "--allow-duplicates/--no-duplicates", "is_allow_duplicates", default=True, help="Dump clauses which already present in CNF"
-)
-def cli(
-    path_cnf,
-    path_backdoors,
-    path_output,
-    limit_backdoors,
-    is_add_derived_units,
-    num_confl,
-    is_allow_duplicates,
+def evaluate_backdoor(
+    solver,
+    variables,
+    num_confl=0,
+    solver_limited=None,
+    partitioner=None,
+    minimizer="espresso",
+    cache=None,
+    harvester=None,
+    timer=None,
 ):
-    time_start = time.time()
+    """
+    Partitions the tasks of a single backdoor (with 1-based variables), optionally
+    determines semi-easy tasks, and minimizes its characteristic function
+    using one of `EASY_MINIMIZERS`, consulting the `MinimizationCache` first.
+    Implications seen while partitioning are collected into `harvester`, if given,
+    and the time of the partitioning, semi-easy and minimizer stages into `timer`.
+
+    ### Returns:
+        `Tuple[float, Optional[List[List[int]]]]`: rho of the backdoor and
+        the derived clauses, or `None` if there are no easy tasks.
+    """
+
+    print(f"Backdoor with {len(variables)} variables: {variables}")
+    if timer is None:
+        timer = StageTimer()
+
+    print(f"Partioning tasks...")
+    with timer.measure("partition"):
+        if partitioner is not None:
+            hard, easy = partitioner.partition_tasks(variables, harvester)
+        else:
+            hard, easy = partition_tasks(solver, variables, harvester=harvester)
+    assert len(hard) + len(easy) == 2 ** len(variables)
+    print(f"Total 2^{len(variables)} = {2**len(variables)} tasks: {len(hard)} hard and {len(easy)} easy")
+
+    if num_confl > 0:
+        print(f"Determining semi-easy tasks using 'solve_limited({num_confl=})'...")
+        time_start_semieasy = time.time()
+        with timer.measure("semieasy"):
+            if partitioner is not None:
+                semieasy = partitioner.determine_semieasy_tasks(hard, num_confl)
+            else:
+                semieasy = determine_semieasy_tasks(solver_limited, hard, num_confl)
+        print(f"... done in {time.time() - time_start_semieasy:.3f} s")
+        print(f"Semi-easy tasks: {len(semieasy)}")
+        easy += semieasy
+
+    rho = len(easy) / 2 ** len(variables)
+    print(f"rho = {len(easy)}/{2**len(variables)} = {rho}")
+
+    # print()
+    print(f"Minimizing characteristic function...")
+    if len(easy) == 0:
+        print(f"skipp backdoors variables)")
+        return rho, None
+    with timer.measure("minimizer"):
+        if cache is None:
+            return rho, EASY_MINIMIZERS[minimizer](variables, easy)
+        key = MinimizationCache.make_key(minimizer, variables, easy)
+        clauses = cache.lookup(key)
+        if clauses is not None:
+            print(f"Found {len(clauses)} clauses in minimization cache")
+        else:
+            clauses = EASY_MINIMIZERS[minimizer](variables, easy)
+            cache.store(key, clauses)
+    return rho, clauses
 
-    print(f"Loading CNF from '{path_cnf}'...")
-    cnf = CNF(from_file=path_cnf)
-    print(f"CNF clauses: {len(cnf.clauses)}")
-    print(f"CNF variables: {cnf.nv}")
 
-    print(f"Grouping CNF clauses by size...")
-    cnf_units = []
-    cnf_binary = []
-    cnf_ternary = []
-    cnf_large = []
-    for clause in cnf.clauses:
-        if len(clause) == 1:
-            cnf_units.append(clause[0])
-        elif len(clause) == 2:
-            cnf_binary.append(tuple(sorted(clause, key=abs)))
-        elif len(clause) == 3:
-            cnf_ternary.append(tuple(sorted(clause, key=abs)))
-        else:
-            cnf_large.append(tuple(sorted(clause, key=abs)))
-    print(f"CNF unit clauses: {len(cnf_units)}")
-    print(f"CNF binary clauses: {len(cnf_binary)}")
-    print(f"CNF ternary clauses: {len(cnf_ternary)}")
-    print(f"CNF large clauses: {len(cnf_large)}")
+_worker_cache = None
+_worker_num_stored = 0
 
-    print()
-    print(f"Loading backdoors from '{path_backdoors}'...")
-    backdoors = parse_backdoors(path_backdoors)
-    print(f"Total backdoors: {len(backdoors)}")
-    if backdoors:
-        print(f"First backdoor size: {len(backdoors[0])}")
 
-    all_backdoors = backdoors
-    if limit_backdoors is not None:
-        print(f"Limiting to {limit_backdoors} backdoors")
-        backdoors = backdoors[:limit_backdoors]
+def _sync_worker_cache(cache_size, path_cache, stored):
+    # The worker cache starts from the entries loaded by the main process and then receives
+    # the results stored by the main process since the last task, like `ParallelPartitioner.added`
+    global _worker_cache, _worker_num_stored
+    if _worker_cache is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _worker_cache = MinimizationCache(cache_size, path_cache)
+    for key, clauses in stored[_worker_num_stored:]:
+        _worker_cache.store(key, clauses)
+    _worker_num_stored = len(stored)
+
+
+def _evaluate_backdoor_in_worker(
+    solver, solver_limited, variables, num_confl, minimizer, cache_size, path_cache, stored, is_harvest, profile_dir, name
+):
+    if cache_size:
+        _sync_worker_cache(cache_size, path_cache, stored)
+    cache = _worker_cache if cache_size else None
+    misses = cache.misses if cache is not None else 0
+    harvester = ImplicationHarvester() if is_harvest else None
+    timer = StageTimer()
+
+    # Worker output is captured and printed by the main process in backdoor order
+    with contextlib.redirect_stdout(io.StringIO()) as log, Profiler(profile_dir).profile(name):
+        rho, clauses = evaluate_backdoor(
+            solver, variables, num_confl, solver_limited, minimizer=minimizer, cache=cache, harvester=harvester, timer=timer
+        )
+    # On a miss, the new result is the most recently used entry, and is handed back to the main cache
+    entry = next(reversed(cache.entries.items())) if cache is not None and cache.misses > misses else None
+    return rho, clauses, log.getvalue(), entry, harvester, timer
+
+
+def _evaluate_backdoors_in_pool(pool, backdoors, num_confl, minimizer, cache, stored, batch_size, is_harvest, profile_dir):
+    # Batches are submitted lazily, so the units derived from
+    # the previous batch already reach the workers with the next one,
+    # and so do the minimization results stored in `stored`
+    cache_size = cache.max_size if cache is not None else 0
+    path_cache = cache.path if cache is not None else None
+    for start in range(0, len(backdoors), batch_size):
+        tasks = [
+            (variables, num_confl, minimizer, cache_size, path_cache, list(stored), is_harvest, profile_dir, f"backdoor_{start + i + 1}")
+            for i, variables in enumerate(backdoors[start : start + batch_size])
+        ]
+        yield from pool.imap(_evaluate_backdoor_in_worker, tasks)
+
+
+def _is_known(clauses, known_clauses):
+    # A `ClauseArray` is queried in bulk, other containers clause by clause
+    if isinstance(known_clauses, ClauseArray):
+        return ClauseArray.from_clauses(clauses).isin(known_clauses)
+    return np.fromiter((tuple(c) in known_clauses for c in clauses), dtype=bool, count=len(clauses))
+
+
+def _count_known(clauses, known_clauses):
+    return int(np.count_nonzero(_is_known(clauses, known_clauses)))
+
+
+def minimize_backdoors(
+    solver,
+    backdoors,
+    known_clauses=(),
+    solver_limited=None,
+    num_confl=0,
+    is_add_derived_units=False,
+    is_allow_duplicates=True,
+    partitioner=None,
+    is_parallel_backdoors=False,
+    minimizer="espresso",
+    cache=None,
+    is_harvest_implications=False,
+    time_budget=None,
+    timer=None,
+    profiler=None,
+):
+    """
+    Derives clauses by minimizing the characteristic function of each backdoor.
+
+    ### Usage:
+    ```
+    with Solver("glucose42", bootstrap_with=cnf) as solver:
+        clauses = minimize_backdoors(solver, parse_backdoors(path_backdoors))
+    ```
+
+    ### Args:
+        - `backdoors`: backdoors with 0-based variables, as returned by `parse_backdoors`.
+        - `known_clauses`: clauses of the formula (any container supporting `in`
+        for clauses sorted by variable), used to count and skip duplicates.
+        - `solver_limited`: solver for 'solve_limited', required if `num_confl > 0`.
+        - `partitioner`: `ParallelPartitioner` used instead of `solver` and `solver_limited`.
+        - `is_parallel_backdoors`: evaluate whole backdoors in the `partitioner` workers
+        instead of splitting the tasks of each backdoor. With `is_add_derived_units`,
+        backdoors are processed in batches of `partitioner.jobs`, and units derived
+        in a batch are added to the workers before the next one.
+        - `minimizer`: name of the characteristic function minimizer, one of `EASY_MINIMIZERS`.
+        - `cache`: `MinimizationCache` consulted before minimization. Workers evaluating
+        whole backdoors keep their own copies, which start from the entries loaded from
+        `cache.path` and receive the results stored since; their new results are stored in `cache`.
+        - `is_harvest_implications`: also derive the units and binary clauses implied
+        by the results of 'propagate' while partitioning, see `ImplicationHarvester`.
+        - `time_budget`: wall-clock budget in seconds. Once it is spent, the remaining
+        backdoors are skipped and the clauses derived so far are returned. Whole backdoors
+        are then evaluated in batches of `partitioner.jobs`, and a started batch is finished.
+        - `timer`: `StageTimer` accumulating the time of the partitioning, semi-easy
+        and minimizer stages, summed over the workers evaluating whole backdoors.
+        - `profiler`: `Profiler` capturing each backdoor as a section `backdoor_<i>`,
+        in the workers when they evaluate whole backdoors. When the `partitioner` splits
+        the tasks of each backdoor, only the main process is profiled.
+
+    ### Returns:
+        `List[List[int]]`: unique derived clauses: units, then binary, ternary and larger clauses.
+    """
 
     unique_variables = sorted(multiunion(backdoors), key=abs)
     print(f"Total variables in {len(backdoors)} backdoors: {sum(map(len, backdoors))}")
@@ -82,10 +210,28 @@ def cli(
     is_using_solve_limited = num_confl > 0
     if is_using_solve_limited:
         print(f"Note: using 'propagate' and 'solve_limited({num_confl=})'")
-        solver_limited = Solver("cadical153", bootstrap_with=cnf)
     else:
         print(f"Note: using 'propagate' only")
 
+    if is_parallel_backdoors:
+        print(f"Note: evaluating backdoors using {partitioner.jobs} worker processes")
+        batch_size = partitioner.jobs if is_add_derived_units or time_budget else max(1, len(backdoors))
+        stored = []
+        # Convert to 1-based:
+        results = _evaluate_backdoors_in_pool(
+            partitioner,
+            [[v + 1 for v in b] for b in backdoors],
+            num_confl,
+            minimizer,
+            cache,
+            stored,
+            batch_size,
+            is_harvest_implications,
+            profiler.profile_dir if profiler is not None else None,
+        )
+
+    harvester = ImplicationHarvester() if is_harvest_implications else None
+
     rho_per_backdoor = []
 
     units_per_backdoor = []
@@ -104,83 +250,86 @@ def cli(
     new_large_per_backdoor = []
     unique_large = set()
 
-    with Solver("glucose42", bootstrap_with=cnf) as solver:
-        for i, variables in enumerate(backdoors):
+    deadline = time.time() + time_budget if time_budget else None
+    for i, variables in enumerate(backdoors):
+        # a batch of the pool is submitted on its first result, so it is only checked between batches
+        if deadline is not None and (not is_parallel_backdoors or i % batch_size == 0) and time.time() >= deadline:
             print()
-            print(f"=== [{i+1}/{len(backdoors)}] " + "-" * 42)
+            print(f"Time budget of {time_budget} s is spent, skipping the remaining {len(backdoors) - i} backdoors")
+            break
 
+        print()
+        print(f"=== [{i+1}/{len(backdoors)}] " + "-" * 42)
+
+        if is_parallel_backdoors:
+            rho, clauses, log, entry, backdoor_harvester, backdoor_timer = next(results)
+            print(log, nl=False)
+            if timer is not None:
+                timer.update(backdoor_timer)
+            if profiler is not None and profiler.profile_dir:
+                profiler.add(f"backdoor_{i + 1}")
+            if harvester is not None:
+                harvester.update(backdoor_harvester)
+            if cache is not None and clauses is not None:
+                if entry is None:
+                    cache.hits += 1
+                else:
+                    cache.misses += 1
+                    cache.store(*entry)
+                    stored.append(entry)
+        else:
             # Convert to 1-based:
             variables = [v + 1 for v in variables]
-
-            print(f"Backdoor with {len(variables)} variables: {variables}")
-
-            print(f"Partioning tasks...")
-            hard, easy = partition_tasks(solver, variables)
-            assert len(hard) + len(easy) == 2 ** len(variables)
-            print(f"Total 2^{len(variables)} = {2**len(variables)} tasks: {len(hard)} hard and {len(easy)} easy")
-
-            if is_using_solve_limited:
-                print(f"Determining semi-easy tasks using 'solve_limited({num_confl=})'...")
-                time_start_semieasy = time.time()
-                semieasy = determine_semieasy_tasks(solver_limited, hard, num_confl)
-                print(f"... done in {time.time() - time_start_semieasy:.3f} s")
-                print(f"Semi-easy tasks: {len(semieasy)}")
-                easy += semieasy
-
-            rho = len(easy) / 2 ** len(variables)
-            print(f"rho = {len(easy)}/{2**len(variables)} = {rho}")
-            rho_per_backdoor.append(rho)
-
-            # print()
-            print(f"Minimizing characteristic function...")
-            if len(easy) == 0:
-                print(f"skipp backdoors variables)")
-                continue
-            clauses = backdoor_to_clauses_via_easy(variables, easy)
-
-            units = sorted((c[0] for c in clauses if len(c) == 1), key=abs)
-            units_per_backdoor.append(units)
-            for unit in units:
-                if -unit in unique_units:
-                    raise RuntimeError(f"Wow! {unit}")
-            new_units = [x for x in units if x not in unique_units]
-            new_units_per_backdoor.append(new_units)
-            unique_units.update(units)
-            print(f"Derived {len(units)} ({len(new_units)} new, {sum(1 for x in units if x in cnf_units)} in cnf) units: {units}")
-
-            binary = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) == 2)
-            binary_per_backdoor.append(binary)
-            new_binary = [x for x in binary if x not in unique_binary]
-            new_binary_per_backdoor.append(new_binary)
-            unique_binary.update(binary)
-            print(
-                f"Derived {len(binary)} ({len(new_binary)} new, {sum(1 for c in binary if c in cnf_binary)} in cnf) binary clauses: {binary}"
-            )
-
-            ternary = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) == 3)
-            ternary_per_backdoor.append(ternary)
-            new_ternary = [x for x in ternary if x not in unique_ternary]
-            new_ternary_per_backdoor.append(new_ternary)
-            unique_ternary.update(ternary)
-            print(
-                f"Derived {len(ternary)} ({len(new_ternary)} new, {sum(1 for c in ternary if c in cnf_ternary)} in cnf) ternary clauses: {ternary}"
-            )
-
-            large = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) > 3)
-            large_per_backdoor.append(large)
-            new_large = [x for x in large if x not in unique_large]
-            new_large_per_backdoor.append(new_large)
-            unique_large.update(large)
-            print(f"Derived {len(large)} ({len(new_large)} new, {sum(1 for c in large if c in cnf_large)} in cnf) large clauses: {large}")
-
-            if is_add_derived_units:
-                for unit in new_units:
+            with profiler.profile(f"backdoor_{i + 1}") if profiler is not None else contextlib.nullcontext():
+                rho, clauses = evaluate_backdoor(
+                    solver, variables, num_confl, solver_limited, partitioner, minimizer, cache, harvester, timer
+                )
+        rho_per_backdoor.append(rho)
+        if clauses is None:
+            continue
+
+        units = sorted((c[0] for c in clauses if len(c) == 1), key=abs)
+        units_per_backdoor.append(units)
+        for unit in units:
+            if -unit in unique_units:
+                raise RuntimeError(f"Wow! {unit}")
+        new_units = [x for x in units if x not in unique_units]
+        new_units_per_backdoor.append(new_units)
+        unique_units.update(units)
+        print(f"Derived {len(units)} ({len(new_units)} new, {_count_known([(x,) for x in units], known_clauses)} in cnf) units: {units}")
+
+        binary = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) == 2)
+        binary_per_backdoor.append(binary)
+        new_binary = [x for x in binary if x not in unique_binary]
+        new_binary_per_backdoor.append(new_binary)
+        unique_binary.update(binary)
+        print(
+            f"Derived {len(binary)} ({len(new_binary)} new, {_count_known(binary, known_clauses)} in cnf) binary clauses: {binary}"
+        )
+
+        ternary = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) == 3)
+        ternary_per_backdoor.append(ternary)
+        new_ternary = [x for x in ternary if x not in unique_ternary]
+        new_ternary_per_backdoor.append(new_ternary)
+        unique_ternary.update(ternary)
+        print(
+            f"Derived {len(ternary)} ({len(new_ternary)} new, {_count_known(ternary, known_clauses)} in cnf) ternary clauses: {ternary}"
+        )
+
+        large = sorted(tuple(sorted(c, key=abs)) for c in clauses if len(c) > 3)
+        large_per_backdoor.append(large)
+        new_large = [x for x in large if x not in unique_large]
+        new_large_per_backdoor.append(new_large)
+        unique_large.update(large)
+        print(f"Derived {len(large)} ({len(new_large)} new, {_count_known(large, known_clauses)} in cnf) large clauses: {large}")
+
+        if is_add_derived_units:
+            for unit in new_units:
+                if partitioner is not None:
+                    partitioner.add_clause([unit])
+                else:
                     solver.add_clause([unit])
 
-    if is_using_solve_limited:
-        solver_limited.delete()
-        del solver_limited
-
     print()
     print("=" * 42)
     print()
@@ -195,30 +344,17 @@ def cli(
     print(f"{large_per_backdoor = }")
     print(f"{new_large_per_backdoor = }")
 
-    if path_output:
+    if harvester is not None:
+        harvested = harvester.clauses()
+        harvested_units = [c[0] for c in harvested if len(c) == 1]
+        harvested_binary = [tuple(c) for c in harvested if len(c) == 2]
         print()
-        print(f"Writing results to '{path_output}'...")
-        with open(path_output, "w") as f:
-            for unit in unique_units:
-                if not is_allow_duplicates and unit in cnf_units:
-                    # skip duplicate
-                    continue
-                f.write(f"{unit} 0\n")
-            for c in unique_binary:
-                if not is_allow_duplicates and c in cnf_binary:
-                    # skip duplicate
-                    continue
-                f.write(" ".join(map(str, c)) + " 0\n")
-            for c in unique_ternary:
-                if not is_allow_duplicates and c in cnf_ternary:
-                    # skip duplicate
-                    continue
-                f.write(" ".join(map(str, c)) + " 0\n")
-            for c in unique_large:
-                if not is_allow_duplicates and c in cnf_large:
-                    # skip duplicate
-                    continue
-                f.write(" ".join(map(str, c)) + " 0\n")
+        print(
+            f"Harvested {len(harvested_units)} ({sum(1 for x in harvested_units if x not in unique_units)} new) units"
+            f" and {len(harvested_binary)} ({sum(1 for c in harvested_binary if c not in unique_binary)} new) binary clauses from propagation"
+        )
+        unique_units.update(harvested_units)
+        unique_binary.update(harvested_binary)
 
     print()
     print(f"Total variables in {len(backdoors)} backdoors: {sum(map(len, backdoors))}")
@@ -228,22 +364,189 @@ def cli(
     )
 
     unique_units = sorted(unique_units, key=abs)
-    print(f"Derived {len(unique_units)} ({sum(1 for x in unique_units if x in cnf_units)} in cnf) unique units: {unique_units}")
-    print(f"Derived {len(unique_binary)} ({sum(1 for c in unique_binary if c in cnf_binary)} in cnf) unique binary")
-    print(f"Derived {len(unique_ternary)} ({sum(1 for c in unique_ternary if c in cnf_ternary)} in cnf) unique ternary")
-    print(f"Derived {len(unique_large)} ({sum(1 for c in unique_large if c in cnf_large)} in cnf) unique large")
+    num_units_in_cnf = _count_known([(x,) for x in unique_units], known_clauses)
+    num_binary_in_cnf = _count_known(list(unique_binary), known_clauses)
+    num_ternary_in_cnf = _count_known(list(unique_ternary), known_clauses)
+    num_large_in_cnf = _count_known(list(unique_large), known_clauses)
+    print(f"Derived {len(unique_units)} ({num_units_in_cnf} in cnf) unique units: {unique_units}")
+    print(f"Derived {len(unique_binary)} ({num_binary_in_cnf} in cnf) unique binary")
+    print(f"Derived {len(unique_ternary)} ({num_ternary_in_cnf} in cnf) unique ternary")
+    print(f"Derived {len(unique_large)} ({num_large_in_cnf} in cnf) unique large")
     print(
-        f"Total derived {len(unique_units)+len(unique_binary)+len(unique_ternary)+len(unique_large)} ({sum(1 for x in unique_units if x in cnf_units) + sum(1 for c in unique_binary if c in cnf_binary) + sum(1 for c in unique_ternary if c in cnf_ternary) + sum(1 for c in unique_large if c in cnf_large)} in cnf) unique clauses"
+        f"Total derived {len(unique_units)+len(unique_binary)+len(unique_ternary)+len(unique_large)} ({num_units_in_cnf + num_binary_in_cnf + num_ternary_in_cnf + num_large_in_cnf} in cnf) unique clauses"
     )
+    if cache is not None:
+        print(f"Minimization cache: {cache.summary()}")
+
+    derived = [[unit] for unit in unique_units]
+    for c in sorted([*unique_binary, *unique_ternary, *unique_large], key=lambda c: (len(c), tuple(map(abs, c)), c)):
+        derived.append(list(c))
+    if not is_allow_duplicates:
+        # skip duplicates
+        derived = [c for c, is_known in zip(derived, _is_known(derived, known_clauses)) if not is_known]
+    return derived
 
-    # print("New:")
-    # for new_units in new_units_per_backdoor:
-    #     print(f"  {new_units}")
-    # print("Units:")
-    # for units in units_per_backdoor:
-    #     print(f"  {units}")
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option("--cnf", "path_cnf", required=True, type=click.Path(exists=True), help="File with CNF")
+@click.option("--backdoors", "path_backdoors", required=True, type=click.Path(exists=True), help="File with backdoors")
+@click.option("-o", "--output", "path_output", type=click.Path(), help="Output file")
+@click.option("--limit", "limit_backdoors", type=int, help="Number of backdoors to use (prefix size)")
+@click.option("--add-units", "is_add_derived_units", is_flag=True, help="Add derived units to the solver")
+@click.option(
+    "--num-confl",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Number of conflicts in 'solve_limited' (0 for using 'propagate')",
+)
+@click.option(
+    "--allow-duplicates/--no-duplicates", "is_allow_duplicates", default=True, help="Dump clauses which already present in CNF"
+)
+@click.option("--jobs", type=int, default=1, show_default=True, help="Number of worker processes")
+@click.option(
+    "--parallel-mode",
+    type=click.Choice(["backdoors", "cubes"]),
+    default="backdoors",
+    show_default=True,
+    help="With '--jobs', evaluate whole backdoors in parallel or split the tasks of each backdoor",
+)
+@click.option(
+    "--minimizer",
+    type=click.Choice(list(EASY_MINIMIZERS)),
+    default="espresso",
+    show_default=True,
+    help="Characteristic function minimizer: Espresso (via PyEDA) or bitset truth table (via NumPy)",
+)
+@click.option("--cache-size", type=int, default=1024, show_default=True, help="Size of the minimization cache (0 to disable)")
+@click.option("--cache-path", "path_cache", type=click.Path(), help="File to load and save the minimization cache")
+@click.option(
+    "--harvest-implications",
+    "is_harvest_implications",
+    is_flag=True,
+    help="Also derive units and binary clauses implied by 'propagate' while partitioning",
+)
+@click.option(
+    "--profile",
+    "profile_dir",
+    type=click.Path(file_okay=False),
+    help="Directory for cProfile dumps of each backdoor ('backdoor_<i>.prof' and a 'backdoor_<i>.txt' report), "
+    "not supported with '--jobs' in the 'cubes' mode",
+)
+@click.option(
+    "--time-budget",
+    type=float,
+    help="Wall-clock budget in seconds, after which the remaining backdoors are skipped and the clauses derived so far are written",
+)
+def cli(
+    path_cnf,
+    path_backdoors,
+    path_output,
+    limit_backdoors,
+    is_add_derived_units,
+    num_confl,
+    is_allow_duplicates,
+    jobs,
+    parallel_mode,
+    minimizer,
+    cache_size,
+    path_cache,
+    is_harvest_implications,
+    time_budget,
+    profile_dir,
+):
+    time_start = time.time()
+
+    if profile_dir and jobs > 1 and parallel_mode == "cubes":
+        raise click.UsageError("'--profile' is not supported with '--jobs' and '--parallel-mode cubes'")
+
+    cache = MinimizationCache(cache_size, path_cache) if cache_size > 0 else None
+    timer = StageTimer()
+    profiler = Profiler(profile_dir)
+
+    print(f"Loading CNF from '{path_cnf}'...")
+    cnf = CNF(from_file=path_cnf)
+    print(f"CNF clauses: {len(cnf.clauses)}")
+    print(f"CNF variables: {cnf.nv}")
+
+    print(f"Grouping CNF clauses by size...")
+    cnf_clauses = ClauseArray.from_clauses(cnf.clauses).unique()
+    print(f"CNF unit clauses: {cnf_clauses.count_by_size(1, 1)}")
+    print(f"CNF binary clauses: {cnf_clauses.count_by_size(2, 2)}")
+    print(f"CNF ternary clauses: {cnf_clauses.count_by_size(3, 3)}")
+    print(f"CNF large clauses: {cnf_clauses.count_by_size(4)}")
+
+    print()
+    print(f"Loading backdoors from '{path_backdoors}'...")
+    backdoors = parse_backdoors(path_backdoors)
+    print(f"Total backdoors: {len(backdoors)}")
+    if backdoors:
+        print(f"First backdoor size: {len(backdoors[0])}")
+
+    if limit_backdoors is not None:
+        print(f"Limiting to {limit_backdoors} backdoors")
+        backdoors = backdoors[:limit_backdoors]
+
+    if jobs > 1:
+        limited_solver_name = "cadical153" if num_confl > 0 else None
+        with ParallelPartitioner(cnf.clauses, jobs, limited_solver_name=limited_solver_name) as partitioner:
+            derived = minimize_backdoors(
+                None,
+                backdoors,
+                known_clauses=cnf_clauses,
+                num_confl=num_confl,
+                is_add_derived_units=is_add_derived_units,
+                is_allow_duplicates=is_allow_duplicates,
+                minimizer=minimizer,
+                cache=cache,
+                is_harvest_implications=is_harvest_implications,
+                time_budget=time_budget,
+                timer=timer,
+                profiler=profiler,
+                partitioner=partitioner,
+                is_parallel_backdoors=parallel_mode == "backdoors",
+            )
+    else:
+        solver_limited = None
+        if num_confl > 0:
+            solver_limited = Solver("cadical153", bootstrap_with=cnf)
+
+        with Solver("glucose42", bootstrap_with=cnf) as solver:
+            derived = minimize_backdoors(
+                solver,
+                backdoors,
+                known_clauses=cnf_clauses,
+                solver_limited=solver_limited,
+                num_confl=num_confl,
+                is_add_derived_units=is_add_derived_units,
+                is_allow_duplicates=is_allow_duplicates,
+                minimizer=minimizer,
+                cache=cache,
+                is_harvest_implications=is_harvest_implications,
+                time_budget=time_budget,
+                timer=timer,
+                profiler=profiler,
+            )
+
+        if solver_limited is not None:
+            solver_limited.delete()
+            del solver_limited
+
+    if cache is not None:
+        cache.save()
+
+    if path_output:
+        print()
+        print(f"Writing {len(derived)} results to '{path_output}'...")
+        with open(path_output, "w") as f:
+            for c in derived:
+                f.write(" ".join(map(str, c)) + " 0\n")
 
     print()
+    print(f"Stage times: {timer.summary()}")
+    if profile_dir:
+        print(f"Hottest functions over all backdoors (profiles in '{profile_dir}'):")
+        print(profiler.summary())
     print(f"All done in {time.time() - time_start:.1f} s")
 
 
@@ -1,3 +1,4 @@
+import contextlib
 import time
 
 import click
@@ -24,6 +25,14 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=99
     show_default=True,
     help="Number of conflicts in 'solve_limited' (0 for using 'propagate')",
 )
+@click.option("--jobs", type=int, default=1, show_default=True, help="Number of worker processes for partitioning tasks")
+@click.option(
+    "--harvest-implications",
+    "is_harvest_implications",
+    is_flag=True,
+    help="Also derive units and binary clauses implied by 'propagate' while partitioning and probing",
+)
+@click.option("--implications-output", "path_implications_output", type=click.Path(), help="Output file for harvested binary clauses")
 def cli(
     path_cnf,
     path_backdoors,
@@ -31,6 +40,9 @@ def cli(
     limit_backdoors,
     is_add_derived_units,
     num_confl,
+    jobs,
+    is_harvest_implications,
+    path_implications_output,
 ):
     time_start = time.time()
 
@@ -63,12 +75,18 @@ def cli(
     else:
         print(f"Note: using 'propagate' only")
 
+    if jobs > 1:
+        print(f"Note: partitioning tasks using {jobs} worker processes")
+
     rho_per_backdoor = []
     unique_derived_units = set()
     units_per_backdoor = []
     new_units_per_backdoor = []
+    harvester = ImplicationHarvester() if is_harvest_implications else None
 
-    with Solver("glucose42", bootstrap_with=cnf) as solver:
+    with Solver("glucose42", bootstrap_with=cnf) as solver, (
+        ParallelPartitioner(cnf.clauses, jobs) if jobs > 1 else contextlib.nullcontext()
+    ) as partitioner:
         for i, variables in enumerate(backdoors):
             print()
             print(f"=== [{i+1}/{len(backdoors)}] " + "-" * 42)
@@ -79,7 +97,10 @@ def cli(
             print(f"Backdoor with {len(variables)} variables: {variables}")
 
             print(f"Partioning tasks...")
-            hard, easy = partition_tasks(solver, variables)
+            if partitioner is not None:
+                hard, easy = partitioner.partition_tasks(variables, harvester)
+            else:
+                hard, easy = partition_tasks(solver, variables, harvester=harvester)
             assert len(hard) + len(easy) == 2 ** len(variables)
             print(f"Total 2^{len(variables)} = {2**len(variables)} tasks: {len(hard)} hard and {len(easy)} easy")
 
@@ -95,7 +116,7 @@ def cli(
                 print(f"... done in {time.time() - time_start_limited:.3f} s")
             else:
                 print(f"Performing failed literal probing using 'propagate'...")
-                units = perform_probing(solver, variables)
+                units = perform_probing(solver, variables, harvester=harvester)
             print(f"Derived {len(units)} units: {units}")
             for unit in units:
                 if -unit in unique_derived_units:
@@ -109,6 +130,8 @@ def cli(
             if is_add_derived_units:
                 for unit in new_units:
                     solver.add_clause([unit])
+                    if partitioner is not None:
+                        partitioner.add_clause([unit])
 
     if is_using_solve_limited:
         solver_limited.delete()
@@ -121,6 +144,17 @@ def cli(
     print(f"Total variables in {len(backdoors)} backdoors: {sum(map(len, backdoors))}")
     print(f"Unique variables in {len(backdoors)} backdoors: {len(unique_variables)}")
 
+    harvested_binary = []
+    if harvester is not None:
+        harvested = harvester.clauses()
+        harvested_units = [c[0] for c in harvested if len(c) == 1]
+        harvested_binary = [c for c in harvested if len(c) == 2]
+        print(
+            f"Harvested {len(harvested_units)} ({sum(1 for x in harvested_units if x not in unique_derived_units)} new) units"
+            f" and {len(harvested_binary)} binary clauses from propagation"
+        )
+        unique_derived_units.update(harvested_units)
+
     unique_derived_units = sorted(unique_derived_units, key=abs)
     print(f"Total {len(unique_derived_units)} unique derived units: {unique_derived_units}")
 
@@ -138,6 +172,12 @@ def cli(
             s = " ".join(map(str, unique_derived_units))
             f.write(f"{s}\n")
 
+    if path_implications_output:
+        print(f"Writing {len(harvested_binary)} harvested binary clauses to '{path_implications_output}'...")
+        with open(path_implications_output, "w") as f:
+            for c in harvested_binary:
+                f.write(" ".join(map(str, c)) + " 0\n")
+
     print()
     print(f"All done in {time.time() - time_start:.1f} s")
 
@@ -1,3 +1,4 @@
+import contextlib
 import time
 
 import click
@@ -23,15 +24,29 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=99
     show_default=True,
     help="Number of conflicts in 'solve_limited' (0 for using 'propagate')",
 )
+@click.option("--jobs", type=int, default=1, show_default=True, help="Number of worker processes for partitioning tasks")
+@click.option(
+    "--profile",
+    "profile_dir",
+    type=click.Path(file_okay=False),
+    help="Directory for cProfile dumps of each backdoor ('backdoor_<i>.prof' and a 'backdoor_<i>.txt' report), "
+    "not supported with '--jobs'",
+)
 def cli(
     path_cnf,
     path_backdoors,
     path_output,
     limit_backdoors,
     num_confl,
+    jobs,
+    profile_dir,
 ):
     time_start = time.time()
 
+    if profile_dir and jobs > 1:
+        raise click.UsageError("'--profile' is not supported with '--jobs'")
+    profiler = Profiler(profile_dir)
+
     print(f"Loading CNF from '{path_cnf}'...")
     cnf = CNF(from_file=path_cnf)
     print(f"CNF clauses: {len(cnf.clauses)}")
@@ -61,48 +76,61 @@ def cli(
     else:
         print(f"Note: using 'propagate' only")
 
+    if jobs > 1:
+        print(f"Note: partitioning tasks using {jobs} worker processes")
+        limited_solver_name = "cadical153" if is_using_solve_limited else None
+
     num_hard_per_backdoor = []
     num_easy_per_backdoor = []
     num_semi_per_backdoor = []
     rho_per_backdoor = []
     rho_t_per_backdoor = []
 
-    with Solver("glucose42", bootstrap_with=cnf) as solver:
+    with Solver("glucose42", bootstrap_with=cnf) as solver, (
+        ParallelPartitioner(cnf.clauses, jobs, limited_solver_name=limited_solver_name) if jobs > 1 else contextlib.nullcontext()
+    ) as partitioner:
         for i, variables in enumerate(backdoors):
             print()
             print(f"=== [{i+1}/{len(backdoors)}] " + "-" * 42)
 
-            # Convert to 1-based:
-            variables = [v + 1 for v in variables]
+            with profiler.profile(f"backdoor_{i + 1}"):
+                # Convert to 1-based:
+                variables = [v + 1 for v in variables]
 
-            print(f"Backdoor with {len(variables)} variables: {variables}")
+                print(f"Backdoor with {len(variables)} variables: {variables}")
 
-            print(f"Partioning 2^{len(variables)} = {2**len(variables)} tasks...")
-            hard, easy = partition_tasks(solver, variables)
-            assert len(hard) + len(easy) == 2 ** len(variables)
-            print(f"Hard tasks: {len(hard)}")
-            print(f"Easy tasks: {len(easy)}")
-            num_hard_per_backdoor.append(len(hard))
-            num_easy_per_backdoor.append(len(easy))
+                print(f"Partioning 2^{len(variables)} = {2**len(variables)} tasks...")
+                if partitioner is not None:
+                    hard, easy = partitioner.partition_tasks(variables)
+                else:
+                    hard, easy = partition_tasks(solver, variables)
+                assert len(hard) + len(easy) == 2 ** len(variables)
+                print(f"Hard tasks: {len(hard)}")
+                print(f"Easy tasks: {len(easy)}")
+                num_hard_per_backdoor.append(len(hard))
+                num_easy_per_backdoor.append(len(easy))
 
-            rho = len(easy) / 2 ** len(variables)
-            print(f"rho = {len(easy)}/{2**len(variables)} = {rho}")
-            rho_per_backdoor.append(rho)
+                rho = len(easy) / 2 ** len(variables)
+                print(f"rho = {len(easy)}/{2**len(variables)} = {rho}")
+                rho_per_backdoor.append(rho)
 
-            if is_using_solve_limited:
-                print(f"Determining semi-easy tasks using 'solve_limited({num_confl=})'...")
-                time_start_semieasy = time.time()
-                semieasy = determine_semieasy_tasks(solver_limited, hard, num_confl)
-                print(f"... done in {time.time() - time_start_semieasy:.3f} s")
-                print(f"Semi-easy tasks: {len(semieasy)}")
-                num_semi_per_backdoor.append(len(semieasy))
-
-                rho_t = (len(easy) + len(semieasy)) / 2 ** len(variables)
-                print(f"rho_t = ({len(easy)}+{len(semieasy)})/{2**len(variables)} = {rho_t}")
-                rho_t_per_backdoor.append(rho_t)
-            else:
-                num_semi_per_backdoor.append(0)
-                rho_t_per_backdoor.append(rho)
+                if is_using_solve_limited:
+                    print(f"Determining semi-easy tasks using 'solve_limited({num_confl=})'...")
+                    time_start_semieasy = time.time()
+                    if partitioner is not None:
+                        semieasy = partitioner.determine_semieasy_tasks(hard, num_confl)
+                    else:
+                        semieasy = determine_semieasy_tasks(solver_limited, hard, num_confl)
+                    print(f"... done in {time.time() - time_start_semieasy:.3f} s")
+                    print(f"Semi-easy tasks: {len(semieasy)}")
+                    num_semi_per_backdoor.append(len(semieasy))
+
+                    rho_t = (len(easy) + len(semieasy)) / 2 ** len(variables)
+                    print(f"rho_t = ({len(easy)}+{len(semieasy)})/{2**len(variables)} = {rho_t}")
+                    rho_t_per_backdoor.append(rho_t)
+                else:
+                    num_semi_per_backdoor.append(0)
+                    rho_t_per_backdoor.append(rho)
 
     if is_using_solve_limited:
         solver_limited.delete()
@@ -146,6 +174,11 @@ def cli(
                 else:
                     f.write(f"{i},{num_hard},{num_easy},{rho}\n")
 
+    if profile_dir:
+        print()
+        print(f"Hottest functions over all backdoors (profiles in '{profile_dir}'):")
+        print(profiler.summary())
+
     print()
     print(f"All done in {time.time() - time_start:.1f} s")
 
@@ -1,8 +1,14 @@
+import contextlib
 import glob
 import itertools
+import queue
 import random
+import re
+import signal
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from time import sleep
 
@@ -11,13 +17,11 @@ import redis
 import os
 import shutil
 
-
-HOST = None
-PORT = None
-REDIS_DECODE_RESPONSES = True
-
-def get_redis_connection():
-    return redis.Redis(host=HOST, port=PORT, decode_responses=REDIS_DECODE_RESPONSES)
+from util.clause_array import ClauseArray
+from util.clause_db import ClauseDatabase
+from util.metrics import MetricsWriter
+from util.redis_transport import RedisTransport
+from util.seen_clause_index import SeenClauseIndex
 
 
 def parse_clause(clause_str: str):
@@ -26,66 +30,482 @@ def parse_clause(clause_str: str):
     if clause[0] == 'd':
         id_del = True
         clause = clause[1:]
+    assert clause[-1] == '0'
     return id_del, list(map(int, clause[:-1]))
 
 
-def get_learners_with_kissat_compatible(last_processed_learnt):
-    con = get_redis_connection()
-    value = con.get(f'from_kissat:{last_processed_learnt}')
-    add_clauses = []
-    delete_clauses = []
-    read_learnt = 0
-    while value is not None:
-        id_del, clause = parse_clause(value)
-        if id_del:
-            delete_clauses.append(clause)
-        else:
-            add_clauses.append(clause)
-        read_learnt += 1
-        value = con.get(f'from_kissat:{last_processed_learnt + read_learnt}')
-    con.close()
-    return read_learnt, add_clauses, delete_clauses
-
-
-def parse_clauses_with_assertion(line):
-    clause_with_zero = line.split()
-    assert clause_with_zero[-1] == '0'
-    return clause_with_zero[:-1]
-
-
-def get_learnts(last_processed_learnt, buffer_size):
-    con = get_redis_connection()
+def get_learnts_by_prefix(transport, prefix, last_processed_learnt, buffer_size):
     add_clauses = []
     delete_clauses = []
     read_learnt = 0
 
-    pipe = con.pipeline()
+    pipe = transport.pipeline()
     while True:
         for i in range(buffer_size):
-            pipe.get(f'from_minisat:{last_processed_learnt + read_learnt + i}')
+            pipe.get(f'{prefix}:{last_processed_learnt + read_learnt + i}')
         result = pipe.execute()
-        for i, clause in enumerate(result):
-            if clause:
-                add_clauses.append(list(map(int, parse_clauses_with_assertion(clause))))
-            else:
-                con.close()
+        for i, value in enumerate(result):
+            if not value:
                 return read_learnt + i, add_clauses, delete_clauses
+            id_del, clause = parse_clause(value)
+            if id_del:
+                delete_clauses.append(clause)
+            else:
+                add_clauses.append(clause)
         read_learnt += buffer_size
 
 
+def get_learners_with_kissat_compatible(transport, last_processed_learnt, buffer_size):
+    return get_learnts_by_prefix(transport, 'from_kissat', last_processed_learnt, buffer_size)
+
+
+def get_learnts(transport, last_processed_learnt, buffer_size):
+    return get_learnts_by_prefix(transport, 'from_minisat', last_processed_learnt, buffer_size)
+
+
+class KeyLearntsSource:
+    """
+    Legacy ingest path: the solver writes learnts to consecutive keys
+    `from_minisat:<n>` (or `from_kissat:<n>`, where deleted clauses are
+    prefixed with `d`) and the producer polls them starting from key 0.
+    """
+
+    def __init__(self, transport, buffer_size, reader=get_learnts, poll_interval=10, max_polls=30):
+        self.transport = transport
+        self.reader = reader
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.max_polls = max_polls
+        self.last_processed_learnt = 0
+        self.read_learnt = 0
+        self.fetch_seconds = 0.0  # time spent in the Redis round trips, without the sleeps between polls
+
+    def read(self):
+        time_start = time.time()
+        self.read_learnt, add_clauses, delete_clauses = self.reader(self.transport, self.last_processed_learnt, self.buffer_size)
+        self.fetch_seconds += time.time() - time_start
+        return self.read_learnt, add_clauses, delete_clauses
+
+    def wait(self, is_poll_counted=lambda: True):
+        num_polls = 0
+        for j in itertools.count():
+            read_learnt, add_clauses, delete_clauses = self.read()
+            if read_learnt != 0:
+                return read_learnt, add_clauses, delete_clauses
+            print(f"Iteration {j}: no new learnts, sleep {self.poll_interval} seconds")
+            sleep(self.poll_interval)
+            num_polls += is_poll_counted()
+            if num_polls > self.max_polls:
+                raise Exception(f"Didn't get new lernts {self.max_polls} times")
+
+    def advance(self):
+        self.last_processed_learnt += self.read_learnt
+        self.read_learnt = 0
+
+    def acknowledge(self, token):
+        pass
+
+
+class StreamLearntsSource:
+    """
+    Ingest path based on Redis Streams. The solver publishes every learnt with
+    `XADD <stream> * clause "<lits> 0"` (deleted clauses are prefixed with `d`),
+    and the producer reads them through a consumer group, so it blocks until new
+    learnts arrive and, after a restart, continues from the last acknowledged entry.
+    """
+
+    def __init__(self, transport, stream, group, consumer, buffer_size, block_ms):
+        self.transport = transport
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.buffer_size = buffer_size
+        self.block_ms = block_ms
+        self.pending_ids = []
+        self.is_recovered = False
+        self.fetch_seconds = 0.0  # time spent in the non-blocking reads, the blocking read mostly waits for learnts
+
+        try:
+            transport.connection.xgroup_create(stream, group, id="0", mkstream=True)
+            print(f"Created consumer group '{group}' for stream '{stream}'")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise e
+
+    def _read_entries(self, con, last_id, block=None):
+        time_start = time.time()
+        response = con.xreadgroup(self.group, self.consumer, {self.stream: last_id}, count=self.buffer_size, block=block)
+        if block is None:
+            self.fetch_seconds += time.time() - time_start
+        if not response:
+            return []
+        _, entries = response[0]
+        return entries
+
+    def _parse_entries(self, entries, add_clauses, delete_clauses):
+        for entry_id, fields in entries:
+            self.pending_ids.append(entry_id)
+            if not fields:
+                # entry was trimmed from the stream after it had been delivered
+                continue
+            id_del, clause = parse_clause(fields["clause"])
+            if id_del:
+                delete_clauses.append(clause)
+            else:
+                add_clauses.append(clause)
+
+    def _read(self, block):
+        con = self.transport.connection
+        add_clauses = []
+        delete_clauses = []
+        read_learnt = len(self.pending_ids)
+
+        if not self.is_recovered:
+            # entries delivered to this consumer before a restart, but never acknowledged
+            last_id = "0"
+            while entries := self._read_entries(con, last_id):
+                self._parse_entries(entries, add_clauses, delete_clauses)
+                last_id = entries[-1][0]
+            self.is_recovered = True
+
+        entries = self._read_entries(con, ">", block)
+        while entries:
+            self._parse_entries(entries, add_clauses, delete_clauses)
+            entries = self._read_entries(con, ">")
+        return len(self.pending_ids) - read_learnt, add_clauses, delete_clauses
+
+    def read(self):
+        return self._read(block=None)
+
+    def wait(self, is_poll_counted=lambda: True):
+        # blocks on the stream without a limit, so polls are never counted
+        for j in itertools.count():
+            read_learnt, add_clauses, delete_clauses = self._read(block=self.block_ms)
+            if read_learnt != 0:
+                return read_learnt, add_clauses, delete_clauses
+            print(f"Iteration {j}: no new learnts in stream '{self.stream}' for {self.block_ms} ms")
+
+    def advance(self):
+        pending_ids = self.pending_ids
+        self.pending_ids = []
+        return pending_ids
+
+    def acknowledge(self, pending_ids):
+        # entries read but not acknowledged are delivered again after a restart
+        pipe = self.transport.pipeline()
+        for i in range(0, len(pending_ids), self.buffer_size):
+            pipe.xack(self.stream, self.group, *pending_ids[i:i + self.buffer_size])
+        pipe.execute()
+
+
+class DratFollowLearntsSource:
+    """
+    Ingest path without Redis: follows a plain binary DRAT proof written by the solver,
+    decoding the bytes appended since the last committed offset. Only whole
+    clauses are consumed, a clause being written is picked up by the next read.
+    """
+
+    def __init__(self, path, chunk_size=1 << 26, poll_interval=10, max_polls=30):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.max_polls = max_polls
+        self.offset = 0  # committed byte offset in the proof
+        self.read_bytes = 0  # bytes decoded since the last commit
+        self.fetch_seconds = 0.0  # time spent reading and decoding the proof, without the sleeps between polls
+
+    def read(self):
+        from scripts.common import decode_binary_drat, iter_binary_drat_blocks
+
+        time_start = time.time()
+        add_clauses = []
+        delete_clauses = []
+        position = self.offset
+        if os.path.exists(self.path):
+            for start, data in iter_binary_drat_blocks(self.path, self.chunk_size, start=self.offset):
+                is_added, literals, offsets = decode_binary_drat(data)
+                literals = literals.tolist()
+                offsets = offsets.tolist()
+                for i, is_add in enumerate(is_added.tolist()):
+                    clause = literals[offsets[i]:offsets[i + 1]]
+                    (add_clauses if is_add else delete_clauses).append(clause)
+                position = start + len(data)
+        self.read_bytes = position - self.offset
+        self.fetch_seconds += time.time() - time_start
+        return len(add_clauses) + len(delete_clauses), add_clauses, delete_clauses
+
+    def wait(self, is_poll_counted=lambda: True):
+        num_polls = 0
+        for j in itertools.count():
+            read_learnt, add_clauses, delete_clauses = self.read()
+            if read_learnt != 0:
+                return read_learnt, add_clauses, delete_clauses
+            print(f"Iteration {j}: no new clauses in '{self.path}' after byte {self.offset}, sleep {self.poll_interval} seconds")
+            sleep(self.poll_interval)
+            num_polls += is_poll_counted()
+            if num_polls > self.max_polls:
+                raise Exception(f"Didn't get new lernts {self.max_polls} times")
+
+    def advance(self):
+        self.offset += self.read_bytes
+        self.read_bytes = 0
+
+    def acknowledge(self, token):
+        pass
+
+
+class PipelineStage(threading.Thread):
+    """
+    Background stage of the pipelined producer. An exception raised by the stage
+    is kept and re-raised in the main thread by `check`.
+    """
+
+    def __init__(self, name, target):
+        super().__init__(name=name, daemon=True)
+        self.target = target
+        self.error = None
+
+    def run(self):
+        try:
+            self.target()
+        except BaseException as e:
+            self.error = e
+
+    def check(self):
+        if self.error is not None:
+            raise Exception(f"Producer stage '{self.name}' failed: {self.error!r}") from self.error
+
+    def get(self, from_queue, block=True, poll_interval=1):
+        # waits on a queue filled or drained by this stage, failing if the stage has died
+        while True:
+            self.check()
+            try:
+                return from_queue.get(block=block, timeout=poll_interval if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+
+    def put(self, to_queue, item, poll_interval=1):
+        while True:
+            self.check()
+            try:
+                return to_queue.put(item, timeout=poll_interval)
+            except queue.Full:
+                pass
+
+
+class LearntsIngestor:
+    """
+    Ingestion stage: reads learnts from a learnts source in a background thread
+    into a bounded queue of batches, so learnts do not pile up unread while the
+    backdoor search runs. When the queue is full, reading stops until the search
+    takes the batches.
+
+    The source only advances its read position for a queued batch. The batch is
+    acknowledged to the source (XACK for a stream) by `commit`, once the main loop
+    has applied the batches of the last `take`, so after a crash the unapplied
+    batches are delivered again. Empty polls count towards the `max_polls` limit
+    of the source only while the main loop is blocked in `take`, not during the search.
+
+    `fetch_seconds` is the time the source spent in its reads for the batches of the
+    last `take`, without the sleeps and blocking between polls, which overlap the search.
+    `wait_seconds` is the time the main loop was blocked in the last `take`.
+    """
+
+    def __init__(self, source, max_batches):
+        self.source = source
+        self.batches = queue.Queue(max_batches)
+        self.stage = PipelineStage("ingest", self._run)
+        self.is_waiting = threading.Event()  # the main loop is blocked in `take`
+        self.fetch_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.tokens = []  # acknowledgement tokens of the batches of the last `take`
+
+    def start(self):
+        self.stage.start()
+        return self
+
+    def _run(self):
+        # the first batch is whatever is available at start, as the first search does not wait for learnts
+        batch = self.source.read()
+        while True:
+            token = self.source.advance()
+            fetch_seconds, self.source.fetch_seconds = self.source.fetch_seconds, 0.0
+            self.batches.put((*batch, fetch_seconds, token))
+            batch = self.source.wait(self.is_waiting.is_set)
+
+    def take(self, block=True):
+        """
+        Merges all queued batches. They are acknowledged to the source by the next `commit`.
+
+        ### Args:
+            `block` (`bool`): wait for at least one batch.
+
+        ### Returns:
+            `tuple[int, list, list]`: number of read learnts, added clauses and deleted clauses.
+        """
+
+        read_learnt, add_clauses, delete_clauses = 0, [], []
+        self.fetch_seconds = 0.0
+        time_start = time.time()
+        if block:
+            self.is_waiting.set()
+        try:
+            batch = self.stage.get(self.batches, block)
+        except queue.Empty:
+            return read_learnt, add_clauses, delete_clauses
+        finally:
+            self.is_waiting.clear()
+            self.wait_seconds = time.time() - time_start
+        while True:
+            read_learnt += batch[0]
+            add_clauses.extend(batch[1])
+            delete_clauses.extend(batch[2])
+            self.fetch_seconds += batch[3]
+            self.tokens.append(batch[4])
+            try:
+                batch = self.batches.get_nowait()
+            except queue.Empty:
+                return read_learnt, add_clauses, delete_clauses
+
+    def commit(self):
+        # acknowledging needs no state of the source shared with the ingestion thread
+        for token in self.tokens:
+            self.source.acknowledge(token)
+        self.tokens = []
+
+
+class ClausePublisher:
+    """
+    Publishing stage: pushes derived clauses to the solver and writes the
+    iteration statistics and metrics in a background thread, while the next
+    search runs. At most `max_pending` iterations wait to be published.
+    """
+
+    def __init__(self, transport, push_chunk_size, max_pending, metrics_writer=None):
+        self.transport = transport
+        self.push_chunk_size = push_chunk_size
+        self.metrics_writer = metrics_writer
+        self.pending = queue.Queue(max_pending)
+        self.stage = PipelineStage("publish", self._run)
+
+    def start(self):
+        self.stage.start()
+        return self
+
+    def _run(self):
+        while (job := self.pending.get()) is not None:
+            i, push_clauses, minimize_clauses, add_clauses, sift_clause, log_dir, delta, metrics = job
+            published = push_to_queue_clause(self.transport, push_clauses, self.push_chunk_size)
+            save_statistics(minimize_clauses, add_clauses, sift_clause, log_dir, delta)
+            if self.metrics_writer is not None:
+                self.metrics_writer.write({
+                    **metrics,
+                    "clauses_pushed": published["clauses"],
+                    "push_bytes": published["bytes"],
+                    "push_seconds": published["seconds"],
+                })
+            print(f"Iteration {i}: published")
+
+    def publish(self, i, push_clauses, minimize_clauses, add_clauses, sift_clause, log_dir, delta, metrics=None):
+        self.stage.put(self.pending, (i, push_clauses, minimize_clauses, add_clauses, sift_clause, log_dir, delta,
+                                      metrics or {"iteration": i}))
+
+    def close(self, timeout=None):
+        # lets the pending iterations be published, unless the stage has already failed
+        if self.stage.error is None and self.stage.is_alive():
+            self.stage.put(self.pending, None)
+            self.stage.join(timeout)
+        self.stage.check()
+
+
 def read_original_clauses(path_cnf):
     from scripts.common import parse_backdoors
     return parse_backdoors(path_cnf)
 
 
+def merge_backdoor_files(paths, output_path):
+    """
+    Concatenates backdoor files, dropping backdoors over an already seen set of
+    variables. Lines are kept verbatim.
+
+    ### Returns:
+        `tuple[int, int]`: number of backdoors read and written.
+    """
+
+    RE = re.compile(r"\[(\d+(?:, \d+)*)\]")
+    seen = set()
+    num_read = 0
+    num_written = 0
+    with open(output_path, "w") as output:
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    if m := RE.search(line):
+                        num_read += 1
+                        key = frozenset(map(int, m.group(1).split(", ")))
+                    else:
+                        key = line
+                    if key not in seen:
+                        seen.add(key)
+                        num_written += m is not None
+                        output.write(line)
+    return num_read, num_written
+
+
+def _wait_searcher(process, deadline, grace_period):
+    """
+    Waits for a backdoor-searcher started in its own process group. Once the
+    `deadline` passes, the group gets SIGTERM, and SIGKILL if it is still alive
+    after `grace_period` seconds.
+
+    ### Returns:
+        `tuple[bytes, bytes, bool]`: stdout, stderr and whether the searcher was stopped.
+    """
+
+    try:
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        return *process.communicate(timeout=timeout), False
+    except subprocess.TimeoutExpired:
+        pass
+    print(f"Search budget is spent, stopping backdoor-searcher (pid {process.pid})")
+    grace_deadline = time.time() + grace_period
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGTERM)
+    try:
+        stdout, stderr = process.communicate(timeout=grace_period)
+    except subprocess.TimeoutExpired:
+        stdout, stderr = None, None
+    # the shell may exit while the searcher behind 'tee' is still alive
+    while _is_process_group_alive(process.pid) and time.time() < grace_deadline:
+        sleep(0.1)
+    if _is_process_group_alive(process.pid):
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL)
+    if stdout is None:
+        stdout, stderr = process.communicate()
+    return stdout, stderr, True
+
+
+def _is_process_group_alive(pgid):
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
 def find_backdoors(path_tmp_dir,
                    combine_path_cnf,
                    ea_num_runs,
                    ea_instance_size,
                    ea_num_iters,
-                   log_dir):
-    # Команда, которую вы хотите выполнить
-    log_backdoor = os.path.join(path_tmp_dir, "log_backdoor-searcher_original.log")
+                   log_dir,
+                   num_searchers=1,
+                   time_budget=None,
+                   grace_period=10):
     backdoor_path = os.path.join(path_tmp_dir, "backdoor_path.txt")
 
     if os.path.exists(backdoor_path):
@@ -94,73 +514,115 @@ def find_backdoors(path_tmp_dir,
     else:
         print(f"{backdoor_path} does not exist.")
 
-    ea_seed = random.randint(1, 10000)
-    command = f"./backdoor-searcher/build/minisat {combine_path_cnf} -ea-num-runs={ea_num_runs} -ea-seed={ea_seed} -ea-instance-size={ea_instance_size} -ea-num-iters={ea_num_iters} -ea-output-path={backdoor_path} 2>&1 | tee {log_backdoor}"
+    # ea_num_runs is split between the searchers, each one runs with its own seed and writes its own file
+    num_searchers = max(1, min(num_searchers, ea_num_runs))
+    deadline = time.time() + time_budget if time_budget else None
+    ea_seeds = random.sample(range(1, 10001), num_searchers)
+    searchers = []
+    for k, ea_seed in enumerate(ea_seeds):
+        suffix = f"_{k}" if num_searchers > 1 else ""
+        num_runs = ea_num_runs // num_searchers + (k < ea_num_runs % num_searchers)
+        log_backdoor = os.path.join(path_tmp_dir, f"log_backdoor-searcher_original{suffix}.log")
+        searcher_path = os.path.join(path_tmp_dir, f"backdoor_path{suffix}.txt")
+        if os.path.exists(searcher_path):
+            os.remove(searcher_path)
+        command = f"./backdoor-searcher/build/minisat {combine_path_cnf} -ea-num-runs={num_runs} -ea-seed={ea_seed} -ea-instance-size={ea_instance_size} -ea-num-iters={ea_num_iters} -ea-output-path={searcher_path} 2>&1 | tee {log_backdoor}"
+
+        # run the command in its own process group, so that the searcher and 'tee' can be stopped together
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   start_new_session=True)
+        searchers.append((suffix, num_runs, ea_seed, searcher_path, command, process))
+
+    # wait for the commands, reading their output in threads, so that no searcher blocks on a full pipe
+    with ThreadPoolExecutor(num_searchers) as executor:
+        outputs = list(executor.map(lambda searcher: _wait_searcher(searcher[-1], deadline, grace_period), searchers))
+
+    for (suffix, num_runs, ea_seed, searcher_path, command, process), (stdout, stderr, is_stopped) in zip(searchers, outputs):
+        print(command)
+        print(stdout)
+        print(stderr)
+
+        if is_stopped:
+            with open(log_dir + f"/find_backdoors_strout{suffix}", 'w') as find_backdoors_stdout_file:
+                find_backdoors_stdout_file.write(stdout.decode('utf-8'))
+            print(f"Find backdoors process was stopped after {time_budget} s, using the backdoors written so far")
+        elif process.returncode == 0:
+            with open(log_dir + f"/find_backdoors_strout{suffix}", 'w') as find_backdoors_stdout_file:
+                find_backdoors_stdout_file.write(stdout.decode('utf-8'))
+            print("Find backdoors process was successful")
+        else:
+            raise Exception(f"There are exception during find backdoors files "
+                            f"path_tmp_dir = {path_tmp_dir}, "
+                            f"combine_path_cnf = {combine_path_cnf} "
+                            f"ea_num_runs = {num_runs} "
+                            f"ea_seed = {ea_seed} "
+                            f"ea_instance_size = {ea_instance_size} "
+                            f"ea_num_iters = {ea_num_iters}: \n"
+                            f"ERROR: {stderr.decode('utf-8')}"
+                            f"STDOUT: {stdout.decode('utf-8')}")
+
+    if num_searchers > 1:
+        num_read, num_unique = merge_backdoor_files([searcher[3] for searcher in searchers], backdoor_path)
+        print(f"Merged {num_read} backdoors from {num_searchers} searchers into {num_unique} unique backdoors")
+    elif not os.path.exists(backdoor_path):
+        # stopped before writing any backdoor
+        open(backdoor_path, "w").close()
+    return backdoor_path
 
-    # Выполнение команды
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-    # Дождитесь выполнения команды и получите выходные данные и ошибки
-    stdout, stderr = process.communicate()
-    print(command)
-    print(stdout)
-    print(stderr)
+class IncrementalSolvers:
+    """
+    Solvers kept alive across producer iterations. They are bootstrapped once
+    with the original formula and then receive only new learnts and derived
+    clauses. Deleted learnts stay in the solvers, which is sound since every
+    learnt is implied by the original formula.
+    """
 
-    if process.returncode == 0:
-        with open(log_dir + "/find_backdoors_strout", 'w') as find_backdoors_stdout_file:
-            find_backdoors_stdout_file.write(stdout.decode('utf-8'))
-        print("Find backdoors process was successful")
-    else:
-        raise Exception(f"There are exception during find backdoors files "
-                        f"path_tmp_dir = {path_tmp_dir}, "
-                        f"combine_path_cnf = {combine_path_cnf} "
-                        f"ea_num_runs = {ea_num_runs} "
-                        f"ea_seed = {ea_seed} "
-                        f"ea_instance_size = {ea_instance_size} "
-                        f"ea_num_iters = {ea_num_iters}: \n"
-                        f"ERROR: {stderr.decode('utf-8')}"
-                        f"STDOUT: {stdout.decode('utf-8')}")
-    return backdoor_path
+    def __init__(self, clauses, is_using_solve_limited):
+        from pysat.solvers import Solver
 
+        self.solver = Solver("glucose42", bootstrap_with=clauses)
+        self.solver_limited = Solver("cadical153", bootstrap_with=clauses) if is_using_solve_limited else None
 
-def combine(path_cnf, add_clauses, combine_path):
-    if not os.path.exists(combine_path):
-        # Файл не существует, создаем его и записываем в него
-        print(f"Writing {len(add_clauses)} extracted clauses to new file'{combine_path}'...")
-        with open(combine_path, "w") as file:
-            with open(path_cnf, 'r') as origin_cnf:
-                file.write(origin_cnf.read())
-                file.write("\n")
-            for clause in add_clauses:
-                file.write(" ".join(map(str, clause)) + " 0\n")
-    else:
-        # Файл существует, дописываем в конец
-        print(f"Writing {len(add_clauses)} extracted clauses to end file '{combine_path}'...")
-        with open(combine_path, "a") as file:
-            for clause in add_clauses:
-                file.write(" ".join(map(str, clause)) + " 0\n")
+    def add_clauses(self, clauses):
+        for clause in clauses:
+            self.solver.add_clause(clause)
+            if self.solver_limited is not None:
+                self.solver_limited.add_clause(clause)
+        return len(clauses)
 
+    def delete(self):
+        self.solver.delete()
+        if self.solver_limited is not None:
+            self.solver_limited.delete()
 
-def minimize(combine_path_cnf, mini_conf, backdoors_path, path_tmp_dir, log_dir):
-    derived_clauses = os.path.join(path_tmp_dir, "derived_original.txt")
-    # вот тут бага так как pysat может быть не установлен на данный компиль
-    command = f"python scripts/minimize.py --cnf {combine_path_cnf} --backdoors {backdoors_path} --num-confl {mini_conf} -o {derived_clauses} --no-duplicates"
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = process.communicate()
-
-    if process.returncode == 0:
-        with open(log_dir + "/minimize_strout", 'w') as minimize_stdout_file:
-            minimize_stdout_file.write(stdout.decode('utf-8'))
-        print("The minimize process was successful")
-    else:
-        raise Exception(f"There are exception during minimize files "
-                        f"combine_path_cnf = {combine_path_cnf}, "
-                        f"backdoors_path = {backdoors_path} "
-                        f"path_tmp_dir = {path_tmp_dir}: \n"
-                        f"ERROR: {stderr.decode('utf-8')}"
-                        f"STDOUT: {stdout.decode('utf-8')}")
 
-    return derived_clauses
+def minimize(solvers, clause_db, mini_conf, minimizer, cache, is_harvest_implications, backdoors_path, path_tmp_dir,
+             time_budget=None, timer=None):
+    from scripts.common import parse_backdoors
+    from scripts.minimize import minimize_backdoors
+
+    backdoors = parse_backdoors(backdoors_path)
+    minimize_clauses = minimize_backdoors(solvers.solver,
+                                          backdoors,
+                                          known_clauses=clause_db,
+                                          solver_limited=solvers.solver_limited,
+                                          num_confl=mini_conf,
+                                          is_allow_duplicates=False,
+                                          minimizer=minimizer,
+                                          cache=cache,
+                                          is_harvest_implications=is_harvest_implications,
+                                          time_budget=time_budget,
+                                          timer=timer)
+    if cache is not None:
+        cache.save()
+
+    derived_clauses = os.path.join(path_tmp_dir, "derived_original.txt")
+    with open(derived_clauses, "w") as file:
+        for clause in minimize_clauses:
+            file.write(" ".join(map(str, clause)) + " 0\n")
+    print("The minimize process was successful")
+    return derived_clauses, minimize_clauses
 
 
 def copy_to(file, to_dir):
@@ -181,44 +643,72 @@ def copy_to(file, to_dir):
         raise e
 
 
-def find_minimize_backdoors(combine_path_cnf, path_tmp_dir,
+def find_minimize_backdoors(solvers, clause_db, combine_path_cnf, path_tmp_dir,
                             ea_num_runs,
                             ea_instance_size,
                             ea_num_iters,
+                            ea_num_searchers,
                             mini_conf,
-                            log_dir):
-    backdoors_path = find_backdoors(path_tmp_dir, combine_path_cnf, ea_num_runs,
-                                    ea_instance_size,
-                                    ea_num_iters, log_dir)
+                            minimizer,
+                            cache,
+                            is_harvest_implications,
+                            log_dir,
+                            search_budget=None,
+                            minimize_budget=None,
+                            timer=None):
+    if timer is None:
+        from scripts.common import StageTimer
+        timer = StageTimer()
+
+    with timer.measure("search"):
+        backdoors_path = find_backdoors(path_tmp_dir, combine_path_cnf, ea_num_runs,
+                                        ea_instance_size,
+                                        ea_num_iters, log_dir, ea_num_searchers, search_budget)
 
     copy_to(backdoors_path, log_dir)
 
-    minimize_backdoors_path = minimize(combine_path_cnf, mini_conf, backdoors_path, path_tmp_dir, log_dir)
+    with timer.measure("minimize"):
+        minimize_backdoors_path, minimize_clauses = minimize(solvers, clause_db, mini_conf, minimizer, cache,
+                                                               is_harvest_implications, backdoors_path, path_tmp_dir,
+                                                               minimize_budget, timer)
 
     copy_to(minimize_backdoors_path, log_dir)
 
-    from util.DIMACS_parser import parse_cnf
-    with open(minimize_backdoors_path, 'r') as minimize_file:
-        minimize_clauses, _, _ = parse_cnf(minimize_file)
-        return minimize_clauses
+    return minimize_clauses
 
 
-def save_backdoors(last_produced_clause, backdoors):
-    con = get_redis_connection()
-    for i, backdoor in enumerate(backdoors):
-        key = f'to_minisat:{last_produced_clause + i}'
-        value = " ".join(map(str, backdoor)) + " 0"
-        con.set(key, value)
-    con.close()
+def _encode_clause(clause):
+    return " ".join(map(str, clause)) + " 0"
 
 
-def push_to_queue_clause(backdoors):
-    con = get_redis_connection()
-    for i, backdoor in enumerate(backdoors):
-        key = f'to_minisat'
-        value = " ".join(map(str, backdoor)) + " 0"
-        con.lpush(key, value)
-    con.close()
+def _report_publish(what, num_clauses, num_bytes, delta):
+    rate = f"{num_clauses / delta:.1f} clauses/s, {num_bytes / delta:.1f} bytes/s" if delta > 0 else "n/a"
+    print(f"Published {num_clauses} clauses ({num_bytes} bytes) to {what} in {delta:.3f} s: {rate}")
+    return {
+        "clauses": num_clauses,
+        "bytes": num_bytes,
+        "seconds": delta,
+    }
+
+
+def save_backdoors(transport, last_produced_clause, backdoors, chunk_size=1000):
+    start_time = time.time()
+    values = [_encode_clause(backdoor) for backdoor in backdoors]
+    pipe = transport.pipeline()
+    for i in range(0, len(values), chunk_size):
+        pipe.mset({f'to_minisat:{last_produced_clause + j}': values[j] for j in range(i, min(i + chunk_size, len(values)))})
+    pipe.execute()
+    return _report_publish("'to_minisat:<n>' keys", len(values), sum(map(len, values)), time.time() - start_time)
+
+
+def push_to_queue_clause(transport, backdoors, chunk_size=1000):
+    start_time = time.time()
+    values = [_encode_clause(backdoor) for backdoor in backdoors]
+    pipe = transport.pipeline()
+    for i in range(0, len(values), chunk_size):
+        pipe.lpush('to_minisat', *values[i:i + chunk_size])
+    pipe.execute()
+    return _report_publish("'to_minisat' queue", len(values), sum(map(len, values)), time.time() - start_time)
 
 
 def save_in_drat_file(tmp_dir, learnts_file_name, learnts):
@@ -266,10 +756,8 @@ def clean_dir(path_dir):
             raise e
 
 
-def clean_redis():
-    con = get_redis_connection()
-    con.flushdb()
-    con.close()
+def clean_redis(transport):
+    transport.connection.flushdb()
 
 
 def check_clauses(clauses, lits, errmsg):
@@ -287,61 +775,49 @@ print = click.echo
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=999, show_default=True)
 
 
-def _get_learnt_set(learnts, filter_function):
-    return set(map(lambda learnt: tuple(sorted(learnt)), filter(filter_function, learnts)))
-
-
 def _get_statistics(derived, learnts):
     origin = _split_clause(learnts)
     derived = _split_clause(derived)
 
-    return {
-        "new_units": derived["new_units"] - origin["new_units"],
-        "new_binary": derived["new_binary"] - origin["new_binary"],
-        "new_ternary": derived["new_ternary"] - origin["new_ternary"],
-        "new_large": derived["new_large"] - origin["new_large"],
-    }
+    return {key: derived[key].difference(origin[key]) for key in derived}
 
 
 def _split_clause(clauses):
-    units = _get_learnt_set(clauses, lambda learnt: len(learnt) == 1)
-    binary = _get_learnt_set(clauses, lambda learnt: len(learnt) == 2)
-    ternary = _get_learnt_set(clauses, lambda learnt: len(learnt) == 3)
-    large = _get_learnt_set(clauses, lambda learnt: len(learnt) > 3)
+    clauses = ClauseArray.from_clauses(clauses).unique()
     return {
-        "new_units": units,
-        "new_binary": binary,
-        "new_ternary": ternary,
-        "new_large": large,
+        "new_units": clauses.by_size(1, 1),
+        "new_binary": clauses.by_size(2, 2),
+        "new_ternary": clauses.by_size(3, 3),
+        "new_large": clauses.by_size(4),
     }
 
 
 def save_statistics(minimize_clauses, add_clauses, sift_clause, log_dir, delta):
+    minimize_clauses = ClauseArray.from_clauses(minimize_clauses)
     with open(log_dir + "/statistics", "w") as statistics_file:
         statistics_file.write(f"All minimized clause: {len(minimize_clauses)} \n")
 
         minimize_clauses_split = _split_clause(minimize_clauses)
 
         for key, learnts_v in minimize_clauses_split.items():
-            statistics_file.write(f"deriving {key} where {len(learnts_v)}: {learnts_v} \n")
+            statistics_file.write(f"deriving {key} where {len(learnts_v)}: {learnts_v.to_tuples()} \n")
 
         derived = _get_statistics(minimize_clauses, add_clauses)
         for key, learnts_v in derived.items():
-            statistics_file.write(f"real deriving unique {key} where {len(learnts_v)}: {learnts_v} \n")
+            statistics_file.write(f"real deriving unique {key} where {len(learnts_v)}: {learnts_v.to_tuples()} \n")
 
         # TODO remove later
         sift_clause_split = _split_clause(sift_clause)
         for key in derived:
-            assert derived[key] == sift_clause_split[key], f"sets mast be equals {derived[key]} :: {sift_clause_split[key]}"
+            assert derived[key].same_clauses(sift_clause_split[key]), \
+                f"sets mast be equals {derived[key].to_tuples()} :: {sift_clause_split[key].to_tuples()}"
 
         statistics_file.write(f"current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} \n")
         statistics_file.write(f"calculation time, seconds: {delta} \n")
 
 
 def sift(minimize_clauses, add_clauses):
-    minimize_clauses_tuple = set(map(tuple, map(sorted, minimize_clauses)))
-    add_clauses_tuple = set(map(tuple, map(sorted, add_clauses)))
-    return minimize_clauses_tuple - add_clauses_tuple
+    return ClauseArray.from_clauses(minimize_clauses).unique().difference(ClauseArray.from_clauses(add_clauses))
 
 
 def check(clauses, validation_set, prefix):
@@ -361,13 +837,66 @@ def check(clauses, validation_set, prefix):
               help="Size of backdoor")
 @click.option("--ea-num-iters", "ea_num_iters", default=2000, show_default=True, type=int,
               help="Count iteration for one backdoor")
+@click.option("--ea-num-searchers", "ea_num_searchers", default=1, show_default=True, type=int,
+              help="Number of backdoor-searcher processes run in parallel with different seeds, "
+                   "splitting '--ea-num-runs' between them (0 for one per CPU)")
 @click.option("--mini-conf", "mini_conf", default=0, show_default=True, type=int,
               help="count conflict during minimization. If not zero, than deep minimization")
+@click.option("--minimizer", "minimizer", default="espresso", show_default=True,
+              type=click.Choice(["espresso", "bitset"]), help="Characteristic function minimizer")
+@click.option("--search-budget", "search_budget", type=float,
+              help="Wall-clock budget of the backdoor search per iteration, seconds. "
+                   "The searchers are then stopped and the backdoors written so far are used")
+@click.option("--minimize-budget", "minimize_budget", type=float,
+              help="Wall-clock budget of the minimization per iteration, seconds. "
+                   "The remaining backdoors are then skipped")
+@click.option("--minimize-cache-size", "minimize_cache_size", default=1024, show_default=True, type=int,
+              help="Size of the minimization cache shared across iterations (0 to disable)")
+@click.option("--persist-minimize-cache/--no-persist-minimize-cache", "is_persist_minimize_cache", default=False,
+              help="Keep the minimization cache in the temporary directory across producer restarts")
+@click.option("--harvest-implications", "is_harvest_implications", is_flag=True,
+              help="Also derive units and binary clauses implied by 'propagate' while partitioning backdoor tasks")
+@click.option("--seen-index", "seen_index_kind", default="hash", show_default=True,
+              type=click.Choice(["none", "hash", "bloom"]),
+              help="Index of original, ingested and pushed clauses, used to skip pushing already known clauses")
+@click.option("--seen-index-bloom-mb", "seen_index_bloom_mb", default=128, show_default=True, type=int,
+              help="Size of the Bloom filter for '--seen-index bloom', MiB")
+@click.option("--persist-seen-index/--no-persist-seen-index", "is_persist_seen_index", default=False,
+              help="Keep the seen-clause index in the temporary directory across producer restarts")
+@click.option("--ingest-queue-size", "ingest_queue_size", default=16, show_default=True, type=int,
+              help="Number of learnt batches read ahead while the backdoor search runs")
+@click.option("--publish-queue-size", "publish_queue_size", default=2, show_default=True, type=int,
+              help="Number of iterations whose derived clauses may wait to be published while the next search runs")
+@click.option("--prometheus-metrics", "is_prometheus_metrics", is_flag=True,
+              help="Also write the metrics of the last iteration to 'metrics.prom' in the root log dir "
+                   "(per-iteration metrics always go to 'metrics.jsonl')")
+@click.option("--profile", "is_profile", is_flag=True,
+              help="Profile each iteration with cProfile into 'profile.prof' and 'profile.txt' in its log dir")
 @click.option("--buffer-size", "buffer_size", default=1000, show_default=True, type=int, help="redis buffer size")
+@click.option("--push-chunk-size", "push_chunk_size", default=1000, show_default=True, type=int,
+              help="Number of clauses packed into one LPUSH when publishing derived clauses")
 @click.option("--root-log-dir", "root_log_dir", required=True, type=click.Path(exists=False),
               help="Path to the root log dir")
 @click.option('--redis-host', default='localhost', help='Redis server host')
 @click.option('--redis-port', default=6379, help='Redis server port')
+@click.option("--redis-unix-socket", "redis_unix_socket", type=click.Path(), help="Redis Unix socket (overrides host and port)")
+@click.option("--redis-socket-timeout", "redis_socket_timeout", type=float, help="Redis socket timeout, seconds (must exceed '--stream-block-ms' with '--learnts-source stream')")
+@click.option("--redis-connect-timeout", "redis_connect_timeout", type=float, help="Redis connect timeout, seconds")
+@click.option("--redis-retries", "redis_retries", default=3, show_default=True, type=int,
+              help="Number of retries of a Redis command on connection errors and timeouts")
+@click.option("--learnts-source", "learnts_source", default="minisat", show_default=True,
+              type=click.Choice(["minisat", "kissat", "stream"]),
+              help="Where to read learnts from: 'from_minisat:<n>' keys, 'from_kissat:<n>' keys or a Redis stream")
+@click.option("--learnts-stream", "learnts_stream", default="from_minisat_stream", show_default=True,
+              help="Redis stream with learnts (for '--learnts-source stream')")
+@click.option("--consumer-group", "consumer_group", default="producer", show_default=True,
+              help="Consumer group used to read the learnts stream")
+@click.option("--consumer-name", "consumer_name", default="producer", show_default=True,
+              help="Consumer name inside the consumer group")
+@click.option("--drat-follow", "path_drat_follow", type=click.Path(),
+              help="Read learnts from a plain (not gzipped) binary DRAT proof being written by the solver (overrides '--learnts-source')")
+@click.option("--stream-block-ms", "stream_block_ms", default=60000, show_default=True, type=int,
+              help="How long to block waiting for new learnts in the stream, milliseconds")
 @click.option(
     "--no-validation/--validation", "no_validation", default=True, help="no validation"
 )
@@ -377,17 +906,56 @@ def start_producer(path_cnf,
                    seed,
                    ea_instance_size,
                    ea_num_iters,
+                   ea_num_searchers,
                    mini_conf,
+                   minimizer,
+                   search_budget,
+                   minimize_budget,
+                   minimize_cache_size,
+                   is_persist_minimize_cache,
+                   is_harvest_implications,
+                   seen_index_kind,
+                   seen_index_bloom_mb,
+                   is_persist_seen_index,
+                   ingest_queue_size,
+                   publish_queue_size,
+                   is_prometheus_metrics,
+                   is_profile,
                    buffer_size,
+                   push_chunk_size,
                    root_log_dir,
                    redis_host,
                    redis_port,
+                   redis_unix_socket,
+                   redis_socket_timeout,
+                   redis_connect_timeout,
+                   redis_retries,
+                   learnts_source,
+                   learnts_stream,
+                   consumer_group,
+                   consumer_name,
+                   path_drat_follow,
+                   stream_block_ms,
                    no_validation):
+    if path_drat_follow and path_drat_follow.endswith(".gz"):
+        raise click.UsageError("'--drat-follow' requires a plain binary DRAT proof, a gzipped one cannot be followed")
+    if (learnts_source == "stream" and not path_drat_follow and redis_socket_timeout is not None
+            and redis_socket_timeout <= stream_block_ms / 1000):
+        # the socket timeout also applies to the blocking XREADGROUP, which would then always time out
+        raise click.UsageError(f"'--redis-socket-timeout' ({redis_socket_timeout} s) must exceed "
+                               f"'--stream-block-ms' ({stream_block_ms} ms) with '--learnts-source stream'")
+
     random.seed(seed)
+    if ea_num_searchers == 0:
+        ea_num_searchers = os.cpu_count()
 
-    global HOST, PORT
-    HOST = redis_host
-    PORT = redis_port
+    transport = RedisTransport(host=redis_host,
+                               port=redis_port,
+                               unix_socket_path=redis_unix_socket,
+                               socket_timeout=redis_socket_timeout,
+                               socket_connect_timeout=redis_connect_timeout,
+                               retries=redis_retries)
+    print(f"Using Redis at {transport.address}")
 
     if not no_validation:
         with open("validation.cnf", 'r') as validation:
@@ -395,58 +963,142 @@ def start_producer(path_cnf,
     else:
         validation_set = None
 
-    last_processed_learnt = 0
     os.makedirs(root_log_dir, exist_ok=True)
     os.makedirs(path_tmp_dir, exist_ok=True)
+    cache = None
+    if minimize_cache_size > 0:
+        from scripts.common import MinimizationCache
+        cache_path = os.path.join(path_tmp_dir, "minimize_cache.pkl") if is_persist_minimize_cache else None
+        # loaded before cleaning the temporary directory and saved back after each minimization
+        cache = MinimizationCache(minimize_cache_size, cache_path)
+    seen_index = None
+    if seen_index_kind != "none":
+        seen_index_path = os.path.join(path_tmp_dir, "seen_index.npz") if is_persist_seen_index else None
+        seen_index = SeenClauseIndex(seen_index_kind, bloom_bits=seen_index_bloom_mb * 8 * 2**20, path=seen_index_path)
     clean_dir(path_tmp_dir)
     clean_dir(root_log_dir)
     combine_path_cnf = os.path.join(path_tmp_dir, "combine.cnf")
-    read_learnt, add_clauses, delete_clauses = get_learnts(last_processed_learnt, buffer_size)
-    for i in itertools.count():
-        print(f'Iteration {i}: new learnts: {read_learnt}')
-        if not no_validation:
-            check(add_clauses, validation_set, "from_minisat")
-            print("validation")
-        log_dir = root_log_dir + f"/{i}"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        combine(path_cnf, add_clauses, combine_path_cnf)
-        start_time = time.time()
-        minimize_clauses = find_minimize_backdoors(combine_path_cnf, path_tmp_dir,
-                                                   ea_num_runs,
-                                                   ea_instance_size,
-                                                   ea_num_iters,
-                                                   mini_conf,
-                                                   log_dir)
-        end_time = time.time()
-
-        if not no_validation:
-            check(minimize_clauses, validation_set, "to_minisat")
-            print("validation")
-
-        print(f"Iteration {i}: save backdoors")
-
-        combine(path_cnf, minimize_clauses, combine_path_cnf)
-
-        last_processed_learnt += read_learnt
-
-        for j in itertools.count():
-            read_learnt, add_clauses, delete_clauses = get_learnts(last_processed_learnt, buffer_size)
-            if len(add_clauses) != 0:
-                break
-            print(f"Iteration {j}: no new learnts, sleep 10 seconds")
-            sleep(10)
-            if j > 30:
-                raise Exception("Didn't get new lernts 30 times")
-
-        sift_clause = sift(minimize_clauses, add_clauses)
-
-        push_to_queue_clause(sift_clause)
-
-        # TODO make learnts set of tuple
-        save_statistics(minimize_clauses, add_clauses, sift_clause, log_dir, end_time - start_time)
+    clause_db = ClauseDatabase.from_dimacs(path_cnf)
+    print(f"Loaded {len(clause_db)} original clauses over {clause_db.num_vars} variables from '{path_cnf}'")
+    solvers = IncrementalSolvers(clause_db, mini_conf > 0)
+    if seen_index is not None:
+        seen_index.add(list(clause_db))
+    if path_drat_follow:
+        print(f"Following binary DRAT proof '{path_drat_follow}'")
+        source = DratFollowLearntsSource(path_drat_follow)
+    elif learnts_source == "stream":
+        source = StreamLearntsSource(transport, learnts_stream, consumer_group, consumer_name, buffer_size, stream_block_ms)
+    elif learnts_source == "kissat":
+        source = KeyLearntsSource(transport, buffer_size, reader=get_learners_with_kissat_compatible)
+    else:
+        source = KeyLearntsSource(transport, buffer_size)
+    from scripts.common import Profiler, StageTimer
 
+    metrics_writer = MetricsWriter(os.path.join(root_log_dir, "metrics.jsonl"),
+                                   os.path.join(root_log_dir, "metrics.prom") if is_prometheus_metrics else None)
+    ingestor = LearntsIngestor(source, ingest_queue_size).start()
+    publisher = ClausePublisher(transport, push_chunk_size, publish_queue_size, metrics_writer).start()
+    try:
+        read_learnt, add_clauses, delete_clauses = ingestor.take()
+        fetch_seconds = ingestor.fetch_seconds
+        wait_seconds = ingestor.wait_seconds
+        for i in itertools.count():
+            print(f'Iteration {i}: new learnts: {read_learnt} ({len(add_clauses)} added, {len(delete_clauses)} deleted)')
+            if not no_validation:
+                check(add_clauses, validation_set, "from_minisat")
+                print("validation")
+            log_dir = root_log_dir + f"/{i}"
+            if not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+
+            # only this thread is profiled: ingestion and publishing run in their own threads
+            profiler = Profiler(log_dir if is_profile else None)
+            with profiler.profile("profile"):
+                timer = StageTimer()
+                with timer.measure("combine"):
+                    if seen_index is not None:
+                        seen_index.add(add_clauses)
+                    new_learnts = clause_db.add_learnts(add_clauses)
+                    removed_learnts = clause_db.delete(delete_clauses)
+                    ingestor.commit()
+                    print(f"Iteration {i}: {len(new_learnts)} new unique learnts, {removed_learnts} learnts removed")
+                    solvers.add_clauses(new_learnts)
+                    clause_db.write_dimacs(combine_path_cnf)
+                metrics = {
+                    "iteration": i,
+                    "learnts_read": read_learnt,
+                    "learnts_added": len(add_clauses),
+                    "learnts_deleted": len(delete_clauses),
+                    "new_unique_learnts": len(new_learnts),
+                    "learnts_removed": removed_learnts,
+                    "fetch_seconds": fetch_seconds,
+                    "wait_seconds": wait_seconds,
+                    "combined_cnf_clauses": len(clause_db),
+                    "combined_cnf_bytes": os.path.getsize(combine_path_cnf),
+                }
+                start_time = time.time()
+                minimize_clauses = find_minimize_backdoors(solvers, clause_db, combine_path_cnf, path_tmp_dir,
+                                                           ea_num_runs,
+                                                           ea_instance_size,
+                                                           ea_num_iters,
+                                                           ea_num_searchers,
+                                                           mini_conf,
+                                                           minimizer,
+                                                           cache,
+                                                           is_harvest_implications,
+                                                           log_dir,
+                                                           search_budget,
+                                                           minimize_budget,
+                                                           timer)
+                end_time = time.time()
+
+                if not no_validation:
+                    check(minimize_clauses, validation_set, "to_minisat")
+                    print("validation")
+
+                print(f"Iteration {i}: save backdoors")
+
+                solvers.add_clauses(clause_db.add_derived(minimize_clauses))
+
+                # learnts ingested during the search: derived clauses already learnt by the solver are not pushed
+                read_learnt, add_clauses, delete_clauses = ingestor.take(block=False)
+                fetch_seconds = ingestor.fetch_seconds
+                wait_seconds = ingestor.wait_seconds
+
+                with timer.measure("sift"):
+                    sift_clause = sift(minimize_clauses, add_clauses)
+
+                    push_clauses = sift_clause
+                    if seen_index is not None:
+                        suppressed = seen_index.num_suppressed
+                        push_clauses = seen_index.filter(sift_clause)
+                        seen_index.add(push_clauses)
+                        seen_index.save()
+                        print(f"Iteration {i}: {seen_index.num_suppressed - suppressed} already seen clauses not pushed, "
+                              f"seen-clause index: {seen_index.summary()}")
+                print(f"Iteration {i}: stage times: {timer.summary()}")
+            if is_profile:
+                print(f"Iteration {i}: hottest functions (profile in '{log_dir}/profile.prof'):")
+                print(profiler.summary(["profile"]))
+
+            metrics.update({f"{stage}_seconds": seconds for stage, seconds in timer.seconds.items()})
+            metrics.update({
+                "derived_clauses": len(minimize_clauses),
+                "sifted_clauses": len(sift_clause),
+                "seen_suppressed_clauses": len(sift_clause) - len(push_clauses),
+            })
+
+            # TODO make learnts set of tuple
+            publisher.publish(i, push_clauses, minimize_clauses, add_clauses, sift_clause, log_dir,
+                              end_time - start_time, metrics)
+
+            if read_learnt == 0:
+                # the next search starts as soon as there are new learnts
+                read_learnt, add_clauses, delete_clauses = ingestor.take()
+                fetch_seconds = ingestor.fetch_seconds
+                wait_seconds = ingestor.wait_seconds
+    finally:
+        publisher.close()
 
 if __name__ == "__main__":
     start_producer()
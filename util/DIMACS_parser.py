@@ -1,3 +1,11 @@
+import mmap
+import os
+import re
+import warnings
+
+import numpy as np
+
+
 def parse_cnf(file):
     clauses = []
 
@@ -54,3 +62,123 @@ def parse_cs_cnf(file):
                     cardinality_constraint_size += 1
     assert all_clause_size == clause_size + cardinality_constraint_size
     return clauses, cardinality_constraints, var, clause_size, clause_size, cardinality_constraint_size
+
+
+_COMMENT_OR_HEADER = re.compile(rb"^[ \t]*[cp][^\n]*", re.MULTILINE)
+_HEADER = re.compile(rb"^[ \t]*p[ \t]+cnf[ \t]+(\d+)[ \t]+(\d+)", re.MULTILINE)
+_TRAILER = re.compile(rb"^[ \t]*%", re.MULTILINE)
+
+
+def _iter_line_chunks(file, chunk_size, is_mmap):
+    # Yields blocks of whole lines, so that no line (and thus no literal) is split between blocks
+    if is_mmap:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < len(data):
+                newline = data.find(b"\n", start + chunk_size)
+                end = len(data) if newline < 0 else newline + 1
+                yield data[start:end]
+                start = end
+        return
+    tail = b""
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        data = tail + data
+        end = data.rfind(b"\n") + 1
+        tail = data[end:]
+        if end:
+            yield data[:end]
+    if tail:
+        yield tail
+
+
+def parse_cnf_flat(path, chunk_size=1 << 24, is_mmap=False):
+    """
+    Streaming DIMACS parser: reads the file in blocks of `chunk_size` bytes
+    (or via `mmap`) and parses each block with NumPy, never holding the whole
+    file as Python strings. Comments, blank lines, clauses spanning several
+    lines and a `%` trailer (everything after it is ignored) are supported.
+
+    ### Usage:
+    ```
+    literals, offsets, var, clause_size = parse_cnf_flat("original.cnf")
+    first_clause = literals[offsets[0] : offsets[1]]
+    ```
+
+    ### Returns:
+        `Tuple[np.ndarray, np.ndarray, int, int]`: flat `int32` array of literals
+        (without terminating zeros), `int64` array of `num_clauses + 1` clause offsets,
+        number of variables and number of clauses from the header.
+    """
+
+    var = 0
+    clause_size = 0
+    literal_blocks = []
+    offset_blocks = [np.zeros(1, dtype=np.int64)]
+    num_literals = 0
+    pending = np.zeros(0, dtype=np.int32)  # literals of a clause not yet terminated by zero
+
+    with open(path, "rb") as file:
+        for chunk in _iter_line_chunks(file, chunk_size, is_mmap):
+            trailer = _TRAILER.search(chunk)
+            if trailer is not None:
+                chunk = chunk[: trailer.start()]
+            header = _HEADER.search(chunk)
+            if header is not None:
+                var = int(header.group(1))
+                clause_size = int(header.group(2))
+            if header is not None or b"c" in chunk:
+                chunk = _COMMENT_OR_HEADER.sub(b"", chunk)
+
+            if chunk and not chunk.isspace():
+                with warnings.catch_warnings():
+                    # NumPy only warns when it stops at malformed data
+                    warnings.simplefilter("error", DeprecationWarning)
+                    try:
+                        values = np.fromstring(chunk, dtype=np.int32, sep=" ")
+                    except (DeprecationWarning, ValueError) as e:
+                        raise ValueError(f"Malformed DIMACS data in '{path}'") from e
+                if len(pending):
+                    values = np.concatenate([pending, values])
+                zeros = np.flatnonzero(values == 0)
+                end = zeros[-1] + 1 if len(zeros) else 0
+                pending = values[end:]
+                literals = values[:end][values[:end] != 0]
+                # The k-th zero terminates a clause ending at (its position - k) in the literal array
+                offset_blocks.append(num_literals + zeros - np.arange(len(zeros), dtype=np.int64))
+                literal_blocks.append(literals)
+                num_literals += len(literals)
+
+            if trailer is not None:
+                break
+
+    assert len(pending) == 0, f"Last clause in '{path}' is not terminated by zero"
+    literals = np.concatenate(literal_blocks) if literal_blocks else np.zeros(0, dtype=np.int32)
+    offsets = np.concatenate(offset_blocks)
+    return literals, offsets, var, clause_size
+
+
+def flat_to_clauses(literals, offsets):
+    """
+    Converts the flat representation of `parse_cnf_flat` to a list of clauses (lists of ints).
+    """
+
+    literals = literals.tolist()
+    offsets = offsets.tolist()
+    return [literals[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def parse_cnf_streaming(path, chunk_size=1 << 24, is_mmap=False):
+    """
+    Drop-in replacement of `parse_cnf` for a file path, built on `parse_cnf_flat`.
+
+    ### Returns:
+        `Tuple[List[List[int]], int, int]`: clauses, number of variables and number of clauses from the header.
+    """
+
+    literals, offsets, var, clause_size = parse_cnf_flat(path, chunk_size, is_mmap)
+    return flat_to_clauses(literals, offsets), var, clause_size
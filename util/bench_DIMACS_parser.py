@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import click
+
+from util.DIMACS_parser import parse_cnf, parse_cnf_flat, parse_cnf_streaming
+
+print = click.echo
+
+CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"], max_content_width=999, show_default=True)
+
+
+def generate_cnf(path, num_vars, num_clauses, seed=42):
+    rng = random.Random(seed)
+    with open(path, "w") as file:
+        file.write(f"c random CNF for benchmarking\np cnf {num_vars} {num_clauses}\n")
+        for _ in range(num_clauses):
+            size = rng.choice([2, 3, 3, 3, 4, 8])
+            clause = [v if rng.random() < 0.5 else -v for v in rng.sample(range(1, num_vars + 1), size)]
+            file.write(" ".join(map(str, clause)) + " 0\n")
+
+
+def measure(name, func):
+    # Timing and memory tracing are separate runs, since tracing slows down allocations
+    time_start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - time_start
+    del result
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:>24}: {elapsed:8.3f} s, peak {peak / 2**20:9.1f} MiB")
+    return result
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option("--cnf", "path_cnf", type=click.Path(exists=True), help="CNF to parse (a random one is generated if not given)")
+@click.option("--num-vars", default=100000, show_default=True, type=int, help="Number of variables of the generated CNF")
+@click.option("--num-clauses", default=1000000, show_default=True, type=int, help="Number of clauses of the generated CNF")
+@click.option("--chunk-size", default=1 << 24, show_default=True, type=int, help="Block size of the streaming parser, bytes")
+def cli(path_cnf, num_vars, num_clauses, chunk_size):
+    """
+    Compares `parse_cnf` with the streaming parsers on time and peak Python memory.
+
+    Run from the repository root: `python -m util.bench_DIMACS_parser`
+    """
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if path_cnf is None:
+            path_cnf = os.path.join(tmp_dir, "random.cnf")
+            print(f"Generating {num_clauses} clauses over {num_vars} variables into '{path_cnf}'...")
+            generate_cnf(path_cnf, num_vars, num_clauses)
+        print(f"CNF size: {os.path.getsize(path_cnf) / 2**20:.1f} MiB")
+
+        def parse_with_readlines():
+            with open(path_cnf, "r") as file:
+                return parse_cnf(file)
+
+        expected = measure("parse_cnf", parse_with_readlines)
+        literals, offsets, _, _ = measure("parse_cnf_flat", lambda: parse_cnf_flat(path_cnf, chunk_size))
+        measure("parse_cnf_flat (mmap)", lambda: parse_cnf_flat(path_cnf, chunk_size, is_mmap=True))
+        actual = measure("parse_cnf_streaming", lambda: parse_cnf_streaming(path_cnf, chunk_size))
+
+        print(f"Flat representation: {(literals.nbytes + offsets.nbytes) / 2**20:.1f} MiB for {len(offsets) - 1} clauses")
+        assert actual == expected, "Streaming parser disagrees with parse_cnf"
+        print("Results are identical")
+
+
+if __name__ == "__main__":
+    cli()
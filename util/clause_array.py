@@ -0,0 +1,192 @@
+import itertools
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN64 = 0x9E3779B97F4A7C15
+
+
+def _mix64(x):
+    # splitmix64 finalizer, for `np.uint64` arrays
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _mix64_int(x):
+    # Same as `_mix64`, for a single Python int
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+def _clause_hashes(literals, offsets):
+    # Order-independent hash of each clause: mixed sum of mixed literals
+    mixed = _mix64(literals.astype(np.int64).astype(np.uint64))
+    sums = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(mixed, dtype=np.uint64)])
+    sizes = np.diff(offsets).astype(np.uint64)
+    return _mix64(sums[offsets[1:]] - sums[offsets[:-1]] + sizes * np.uint64(_GOLDEN64))
+
+
+def _clause_hash(clause):
+    total = sum(_mix64_int(lit & _MASK64) for lit in clause)
+    return _mix64_int((total + len(clause) * _GOLDEN64) & _MASK64)
+
+
+def _gather_indices(offsets, indices):
+    # Positions of the literals of clauses `indices` in the flat array, and the new offsets
+    sizes = offsets[1:][indices] - offsets[:-1][indices]
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=new_offsets[1:])
+    positions = np.repeat(offsets[:-1][indices] - new_offsets[:-1], sizes) + np.arange(new_offsets[-1], dtype=np.int64)
+    return positions, new_offsets
+
+
+class ClauseArray:
+    """
+    Immutable batch of clauses stored as a flat `int32` array of literals
+    (sorted within each clause) with `int64` clause offsets and precomputed
+    64-bit clause hashes, so that size bucketing, deduplication, membership
+    and set difference are vectorized. Hash matches are always verified
+    against the literals, so collisions never merge distinct clauses.
+
+    ### Usage:
+    ```
+    learnts = ClauseArray.from_clauses(add_clauses)
+    new = ClauseArray.from_clauses(derived).unique().difference(learnts)
+    binary = new.by_size(2, 2)
+    ```
+    """
+
+    def __init__(self, literals, offsets, hashes=None):
+        self.literals = literals
+        self.offsets = offsets
+        self.sizes = np.diff(offsets)
+        self.hashes = _clause_hashes(literals, offsets) if hashes is None else hashes
+        self._order = None  # clause indices sorted by hash, built on the first lookup
+        self._sorted_hashes = None
+
+    @classmethod
+    def from_clauses(cls, clauses):
+        if isinstance(clauses, ClauseArray):
+            return clauses
+        clauses = list(clauses)
+        offsets = np.zeros(len(clauses) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, clauses), dtype=np.int64, count=len(clauses)), out=offsets[1:])
+        literals = np.fromiter(itertools.chain.from_iterable(clauses), dtype=np.int32, count=offsets[-1])
+        return cls.from_flat(literals, offsets)
+
+    @classmethod
+    def from_flat(cls, literals, offsets):
+        """
+        Builds the array from flat literals and offsets, e.g. as returned by `parse_cnf_flat`.
+        """
+
+        clause_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        return cls(literals[np.lexsort((literals, clause_ids))], offsets)
+
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        literals, offsets = take_clauses(self.literals, self.offsets, indices)
+        return ClauseArray(literals, offsets, self.hashes[indices])
+
+    def by_size(self, min_size, max_size=None):
+        """
+        Clauses with `min_size <= len(clause) <= max_size` (no upper bound if `max_size` is `None`).
+        """
+
+        return self.take(np.flatnonzero(self._size_mask(min_size, max_size)))
+
+    def count_by_size(self, min_size, max_size=None):
+        return int(np.count_nonzero(self._size_mask(min_size, max_size)))
+
+    def _size_mask(self, min_size, max_size):
+        mask = self.sizes >= min_size
+        if max_size is not None:
+            mask &= self.sizes <= max_size
+        return mask
+
+    def unique(self):
+        """
+        Distinct clauses, in the order of their first occurrence.
+        """
+
+        _, first = np.unique(self.hashes, return_index=True)
+        representative = first[np.searchsorted(self.hashes[first], self.hashes)]
+        # Keep the clauses which only share the hash with their representative
+        is_kept = ~_equal_clauses(self, np.arange(len(self)), self, representative)
+        is_kept[first] = True
+        return self.take(np.flatnonzero(is_kept))
+
+    def isin(self, other):
+        """
+        ### Returns:
+            `np.ndarray`: boolean mask of the clauses present in `other`.
+        """
+
+        candidates, is_found = other._lookup(self.hashes)
+        indices = np.flatnonzero(is_found)
+        is_found[indices] = _equal_clauses(self, indices, other, candidates[indices])
+        return is_found
+
+    def difference(self, other):
+        return self.take(np.flatnonzero(~self.isin(other)))
+
+    def same_clauses(self, other):
+        """
+        Set equality: both arrays contain the same distinct clauses.
+        """
+
+        return self.isin(other).all() and other.isin(self).all()
+
+    def _lookup(self, hashes):
+        if len(self) == 0:
+            return np.zeros(len(hashes), dtype=np.int64), np.zeros(len(hashes), dtype=bool)
+        if self._order is None:
+            self._order = np.argsort(self.hashes, kind="stable")
+            self._sorted_hashes = self.hashes[self._order]
+        positions = np.minimum(np.searchsorted(self._sorted_hashes, hashes), len(self) - 1)
+        return self._order[positions], self._sorted_hashes[positions] == hashes
+
+    def to_tuples(self):
+        literals = self.literals.tolist()
+        offsets = self.offsets.tolist()
+        return [tuple(literals[offsets[i] : offsets[i + 1]]) for i in range(len(self))]
+
+    def __contains__(self, clause):
+        candidates, is_found = self._lookup(np.array([_clause_hash(clause)], dtype=np.uint64))
+        if not is_found[0]:
+            return False
+        i = candidates[0]
+        return self.literals[self.offsets[i] : self.offsets[i + 1]].tolist() == sorted(clause)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(self.to_tuples())
+
+
+def _equal_clauses(a, a_indices, b, b_indices):
+    # Literal-wise comparison of the pairs of clauses `a[a_indices[j]]` and `b[b_indices[j]]`
+    is_equal = a.sizes[a_indices] == b.sizes[b_indices]
+    pairs = np.flatnonzero(is_equal)
+    a_positions, pair_offsets = _gather_indices(a.offsets, a_indices[pairs])
+    b_positions, _ = _gather_indices(b.offsets, b_indices[pairs])
+    mismatches = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(a.literals[a_positions] != b.literals[b_positions])])
+    is_equal[pairs] = mismatches[pair_offsets[1:]] == mismatches[pair_offsets[:-1]]
+    return is_equal
+
+
+def take_clauses(literals, offsets, indices):
+    """
+    Selects clauses `indices` of the flat representation (`literals`, `offsets`).
+
+    ### Returns:
+        `Tuple[np.ndarray, np.ndarray]`: literals and offsets of the selected clauses.
+    """
+
+    positions, new_offsets = _gather_indices(offsets, np.asarray(indices, dtype=np.int64))
+    return literals[positions], new_offsets
@@ -0,0 +1,109 @@
+import collections
+
+from util.DIMACS_parser import parse_cnf_streaming
+
+ORIGINAL = "original"
+LEARNT = "learnt"
+DERIVED = "derived"
+
+
+def canonical_clause(clause):
+    return tuple(sorted(set(clause), key=lambda lit: (abs(lit), lit)))
+
+
+class ClauseDatabase:
+    """
+    In-memory formula of the producer: original clauses, learnts received from
+    the solver and clauses derived via backdoors, each stored once in canonical
+    form. Only learnts can be deleted, original and derived clauses are kept.
+
+    ### Usage:
+    ```
+    db = ClauseDatabase.from_dimacs("original.cnf")
+    db.add_learnts(add_clauses)
+    db.delete(delete_clauses)
+    db.write_dimacs("combine.cnf")
+    ```
+    """
+
+    def __init__(self, num_vars=0):
+        self.clauses = {}  # canonical clause -> kind, in insertion order
+        self.counts = collections.Counter()
+        self.num_vars = num_vars
+        self.is_dirty = True
+
+    @classmethod
+    def from_dimacs(cls, path):
+        clauses, var, _ = parse_cnf_streaming(path, is_mmap=True)
+        db = cls(var)
+        db.add(clauses, ORIGINAL)
+        return db
+
+    def add(self, clauses, kind):
+        """
+        Adds the clauses which are not yet in the database.
+
+        ### Returns:
+            `List[Tuple[int]]`: canonical forms of the newly added clauses.
+        """
+
+        added = []
+        for clause in clauses:
+            key = canonical_clause(clause)
+            if key in self.clauses:
+                continue
+            self.clauses[key] = kind
+            self.counts[kind] += 1
+            if key:
+                self.num_vars = max(self.num_vars, abs(key[-1]))
+            added.append(key)
+        if added:
+            self.is_dirty = True
+        return added
+
+    def add_learnts(self, clauses):
+        return self.add(clauses, LEARNT)
+
+    def add_derived(self, clauses):
+        return self.add(clauses, DERIVED)
+
+    def delete(self, clauses):
+        removed = 0
+        for clause in clauses:
+            key = canonical_clause(clause)
+            if self.clauses.get(key) == LEARNT:
+                del self.clauses[key]
+                self.counts[LEARNT] -= 1
+                removed += 1
+        if removed:
+            self.is_dirty = True
+        return removed
+
+    def write_dimacs(self, path):
+        """
+        Materializes the current formula as a DIMACS file, unless nothing
+        has changed since the previous snapshot.
+        """
+
+        if not self.is_dirty:
+            print(f"Clause database is unchanged, keeping '{path}'")
+            return path
+        with open(path, "w") as file:
+            file.write(f"p cnf {self.num_vars} {len(self.clauses)}\n")
+            for clause in self.clauses:
+                file.write(" ".join(map(str, clause)) + " 0\n")
+        self.is_dirty = False
+        print(f"Written {len(self.clauses)} clauses ({self.summary()}) to '{path}'")
+        return path
+
+    def summary(self):
+        return ", ".join(f"{self.counts[kind]} {kind}" for kind in (ORIGINAL, LEARNT, DERIVED))
+
+    def __len__(self):
+        return len(self.clauses)
+
+    def __contains__(self, clause):
+        return canonical_clause(clause) in self.clauses
+
+    def __iter__(self):
+        return iter(self.clauses)
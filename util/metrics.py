@@ -0,0 +1,43 @@
+import json
+import os
+import time
+
+
+class MetricsWriter:
+    """
+    Per-iteration metrics of the producer. Each call of `write` appends one JSON
+    line to `path_jsonl`. If `path_prom` is given, the numeric metrics of the
+    last iteration are also written there in the Prometheus text format, for the
+    node_exporter textfile collector. That file is replaced atomically, so a
+    scrape never sees a partial file.
+
+    ### Usage:
+    ```
+    writer = MetricsWriter("log/metrics.jsonl", "log/metrics.prom")
+    writer.write({"iteration": 0, "search_seconds": 12.5, "clauses_pushed": 42})
+    ```
+    """
+
+    def __init__(self, path_jsonl, path_prom=None, prefix="clause_producer"):
+        self.path_jsonl = path_jsonl
+        self.path_prom = path_prom
+        self.prefix = prefix
+
+    def write(self, metrics):
+        metrics = {"timestamp": time.time(), **metrics}
+        with open(self.path_jsonl, "a") as file:
+            file.write(json.dumps(metrics) + "\n")
+        if self.path_prom:
+            self._write_prom(metrics)
+
+    def _write_prom(self, metrics):
+        lines = []
+        for name, value in metrics.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.append(f"{self.prefix}_{name} {value}")
+        tmp_path = self.path_prom + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path_prom)
@@ -0,0 +1,58 @@
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+
+class RedisTransport:
+    """
+    Single pooled Redis connection shared by all producer I/O helpers.
+
+    ### Usage:
+    ```
+    with RedisTransport(host="localhost", port=6379) as transport:
+        transport.connection.get("from_minisat:0")
+    ```
+    """
+
+    def __init__(self,
+                 host="localhost",
+                 port=6379,
+                 unix_socket_path=None,
+                 socket_timeout=None,
+                 socket_connect_timeout=None,
+                 retries=3,
+                 max_connections=None,
+                 decode_responses=True):
+        retry = Retry(ExponentialBackoff(), retries)
+        common_kwargs = dict(
+            socket_timeout=socket_timeout,
+            retry=retry,
+            retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+            decode_responses=decode_responses,
+            max_connections=max_connections,
+        )
+        if unix_socket_path:
+            self.address = f"unix://{unix_socket_path}"
+            self.pool = redis.ConnectionPool(connection_class=redis.UnixDomainSocketConnection,
+                                             path=unix_socket_path,
+                                             **common_kwargs)
+        else:
+            self.address = f"{host}:{port}"
+            self.pool = redis.ConnectionPool(host=host,
+                                             port=port,
+                                             socket_connect_timeout=socket_connect_timeout,
+                                             **common_kwargs)
+        self.connection = redis.Redis(connection_pool=self.pool)
+
+    def pipeline(self, transaction=False):
+        return self.connection.pipeline(transaction=transaction)
+
+    def close(self):
+        self.connection.close()
+        self.pool.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
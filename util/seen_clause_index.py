@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+
+from util.clause_array import ClauseArray
+
+HASH = "hash"
+BLOOM = "bloom"
+
+
+class SeenClauseIndex:
+    """
+    Index of every clause the producer has seen: original clauses, all ingested
+    learnts (including later deleted ones) and all pushed clauses, used to avoid
+    sending the solver a clause it already has. Clauses are identified by the
+    64-bit order-independent hash of `ClauseArray`.
+
+    With `kind="hash"`, the hashes are kept in a sorted `uint64` array (8 bytes
+    per clause), and only a 64-bit hash collision can suppress an unseen clause.
+    With `kind="bloom"`, a Bloom filter of `bloom_bits` bits bounds the memory,
+    at the cost of rarely suppressing a clause which was never seen.
+    If `path` is given, the index is loaded from it (if the file exists) and `save` writes it back.
+
+    ### Usage:
+    ```
+    index = SeenClauseIndex()
+    index.add(original_clauses)
+    fresh = index.filter(derived_clauses)
+    index.add(fresh)
+    ```
+    """
+
+    def __init__(self, kind=HASH, bloom_bits=1 << 30, bloom_hashes=7, path=None):
+        self.kind = kind
+        self.path = path
+        self.bloom_hashes = bloom_hashes
+        self.num_added = 0
+        self.num_suppressed = 0
+        if kind == BLOOM:
+            self.bits = np.zeros((bloom_bits + 7) // 8, dtype=np.uint8)
+        elif kind == HASH:
+            self.hashes = np.zeros(0, dtype=np.uint64)
+        else:
+            raise ValueError(f"Unknown seen-clause index kind: '{kind}'")
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                if kind == BLOOM:
+                    self.bits = data["bits"]
+                else:
+                    self.hashes = data["hashes"]
+                self.num_added = int(data["num_added"])
+            print(f"Loaded seen-clause index of {self.num_added} clauses from '{path}'")
+
+    def _bit_positions(self, hashes):
+        # Double hashing over the halves of the clause hash: the i-th position is `h1 + i * h2` modulo the number of bits
+        num_bits = np.uint64(len(self.bits) * 8)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        return [(h1 + np.uint64(i) * h2) % num_bits for i in range(self.bloom_hashes)]
+
+    def add(self, clauses):
+        hashes = ClauseArray.from_clauses(clauses).hashes
+        if self.kind == BLOOM:
+            for positions in self._bit_positions(hashes):
+                np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+            self.num_added += len(hashes)
+        else:
+            size = len(self.hashes)
+            self.hashes = np.union1d(self.hashes, hashes)
+            self.num_added += len(self.hashes) - size
+
+    def contains(self, clauses):
+        """
+        ### Returns:
+            `np.ndarray`: boolean mask of the clauses which have been seen.
+        """
+
+        hashes = ClauseArray.from_clauses(clauses).hashes
+        if self.kind == BLOOM:
+            is_seen = np.ones(len(hashes), dtype=bool)
+            for positions in self._bit_positions(hashes):
+                bits = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+                is_seen &= (bits & 1).astype(bool)
+            return is_seen
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), max(len(self.hashes) - 1, 0))
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        return self.hashes[positions] == hashes
+
+    def filter(self, clauses):
+        """
+        Drops the clauses which have been seen, counting them as suppressed.
+
+        ### Returns:
+            `ClauseArray`: unseen clauses.
+        """
+
+        clauses = ClauseArray.from_clauses(clauses)
+        is_seen = self.contains(clauses)
+        self.num_suppressed += int(np.count_nonzero(is_seen))
+        return clauses.take(np.flatnonzero(~is_seen))
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp.npz"
+        if self.kind == BLOOM:
+            np.savez(tmp_path, bits=self.bits, num_added=self.num_added)
+        else:
+            np.savez(tmp_path, hashes=self.hashes, num_added=self.num_added)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        if self.kind == BLOOM:
+            memory = self.bits.nbytes
+        else:
+            memory = self.hashes.nbytes
+        return f"{self.num_added} clauses ({self.kind}, {memory / 2**20:.1f} MiB), {self.num_suppressed} duplicates suppressed"